@@ -0,0 +1,14 @@
+import os
+
+# Benchmarks run offline; satisfy the required settings before they are read.
+for _key, _default in (
+    ("TOKEN", "benchmark"),
+    ("SUMMARY_OUTPUT_TABLE", "summary"),
+    ("SUMMARY_HIST_OUTPUT_TABLE", "summary_hist"),
+    ("DB_TICKERS_QUERY", "benchmark"),
+    ("MSSQL_SERVER", "benchmark"),
+    ("MSSQL_DATABASE", "benchmark"),
+    ("MSSQL_USERNAME", "benchmark"),
+    ("MSSQL_PASSWORD", "benchmark"),
+):
+    os.environ.setdefault(_key, _default)
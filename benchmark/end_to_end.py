@@ -0,0 +1,224 @@
+"""
+Runs fetch, transform and write end to end through the staged `Pipeline`
+against a local mock server, writing to an in-memory or SQLite sink instead
+of SQL Server, or to the Parquet sink. Reports per-stage throughput, p50/p99
+latency and peak RSS. Payloads, errors and stalls are seeded so runs can be
+compared across changes; `--output` keeps the figures as JSON.
+
+    python -m benchmark.end_to_end --tickers 2000 --latency 0.05
+    python -m benchmark.end_to_end --sink sqlite --error-rate 0.01 --repeat 3
+    python -m benchmark.end_to_end --sink parquet
+    python -m benchmark.end_to_end --output before.json
+
+Peak RSS is the process high-water mark, so it includes the mock server's
+payloads and grows monotonically across repeats.
+"""
+
+import argparse
+import json
+import logging
+import math
+import os
+import resource
+import sqlite3
+import sys
+import tempfile
+import time
+
+import benchmark  # noqa: F401
+from benchmark.mock_server import MockEODHDServer
+from client.eodhd import EODHD
+from config import logger
+from config.settings import PIPELINE_QUEUE_SIZE
+from database.parquet import ParquetWriter
+from main import fetch_batch, transform_batch
+from metrics import FETCH_SECONDS, REGISTRY
+from pipeline import Pipeline
+
+
+class MemoryWriter:
+    """Counts each batch's rows and drops the frames."""
+
+    def __init__(self):
+        self.rows = {}
+
+    def write(self, tables):
+        for t, df in tables.items():
+            self.rows[t] = self.rows.get(t, 0) + len(df)
+        return True
+
+    def finish(self):
+        pass
+
+
+class SQLiteWriter(MemoryWriter):
+    """Appends each batch to SQLite tables, replaced by the run's first batch."""
+
+    def __init__(self, path):
+        super().__init__()
+        self.cnx = sqlite3.connect(path)
+
+    def write(self, tables):
+        for t, df in tables.items():
+            if_exists = "append" if t in self.rows else "replace"
+            df.to_sql(t, self.cnx, if_exists=if_exists, index=False)
+        self.cnx.commit()
+        return super().write(tables)
+
+    def finish(self):
+        self.cnx.close()
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[max(0, math.ceil(q * len(values)) - 1)]
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / 1024**2 if sys.platform == "darwin" else peak / 1024
+
+
+def rows(tables):
+    return sum(len(df) for df in tables.values())
+
+
+def run(tickers, batch_size, writer):
+    REGISTRY.reset()
+    seconds = {"fetch": [], "transform": [], "write": []}
+    units = dict.fromkeys(seconds, 0)
+
+    def timed(stage, func, count):
+        def call(i, item):
+            start = time.perf_counter()
+            result = func(i, item)
+            seconds[stage].append(time.perf_counter() - start)
+            units[stage] += count(item, result)
+            return result
+
+        return call
+
+    pipeline = Pipeline(
+        fetch=timed("fetch", fetch_batch, lambda batch, _: len(batch)),
+        transform=timed("transform", transform_batch, lambda _, out: rows(out)),
+        write=timed("write", lambda i, t: writer.write(t), lambda t, _: rows(t)),
+        queue_size=PIPELINE_QUEUE_SIZE,
+    )
+    batches = [tickers[z : z + batch_size] for z in range(0, len(tickers), batch_size)]
+
+    start = time.perf_counter()
+    pipeline.run(batches)
+    writer.finish()
+    elapsed = time.perf_counter() - start
+
+    requests = [0] * len(FETCH_SECONDS.buckets)
+    for _, (counts, _) in FETCH_SECONDS.series():
+        requests = [a + b for a, b in zip(requests, counts)]
+
+    return {
+        "seconds": elapsed,
+        "tickers": len(tickers),
+        "stages": {
+            stage: {
+                "unit": "tickers" if stage == "fetch" else "rows",
+                "count": units[stage],
+                "seconds": sum(times),
+                "per_second": units[stage] / sum(times) if sum(times) else None,
+                "batch_p50": percentile(times, 0.5),
+                "batch_p99": percentile(times, 0.99),
+            }
+            for stage, times in seconds.items()
+        },
+        # Interpolated within the fetch histogram's buckets
+        "requests": {
+            "count": sum(requests),
+            "p50": FETCH_SECONDS.quantile(0.5, requests),
+            "p99": FETCH_SECONDS.quantile(0.99, requests),
+        },
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def report(n, result):
+    print(
+        f"run {n}: {result['tickers']} tickers in {result['seconds']:.2f}s "
+        f"({result['tickers'] / result['seconds']:.0f} tickers/s), "
+        f"peak RSS {result['peak_rss_mb']:.0f} MB"
+    )
+    for stage, s in result["stages"].items():
+        rate = f"{s['per_second']:,.0f}" if s["per_second"] else "-"
+        print(
+            f"  {stage:>9}: {s['count']} {s['unit']} in {s['seconds']:.2f}s "
+            f"({rate} {s['unit']}/s), batch p50 {s['batch_p50']:.3f}s "
+            f"p99 {s['batch_p99']:.3f}s"
+        )
+    r = result["requests"]
+    print(
+        f"  {'requests':>9}: {r['count']} sent, p50 {r['p50'] * 1000:.0f} ms "
+        f"p99 {r['p99'] * 1000:.0f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tickers", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=250)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--stall-rate", type=float, default=0.0)
+    parser.add_argument("--stall", type=float, default=5.0)
+    parser.add_argument("--quarters", type=int, default=40)
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--noise", type=int, default=200)
+    parser.add_argument(
+        "--sink", choices=("memory", "sqlite", "parquet"), default="memory"
+    )
+    parser.add_argument(
+        "--sqlite-path", help="keep the SQLite output here instead of a temp file"
+    )
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write every run's figures here as JSON")
+    args = parser.parse_args()
+    # Per-batch progress logs would drown the report
+    logger.setLevel(logging.WARNING)
+
+    tickers = [(f"T{i}.US", f"T{i} US Equity", "USD") for i in range(args.tickers)]
+    results = []
+    with tempfile.TemporaryDirectory() as tmp, MockEODHDServer(
+        latency=args.latency,
+        error_rate=args.error_rate,
+        stall_rate=args.stall_rate,
+        stall=args.stall,
+        quarters=args.quarters,
+        years=args.years,
+        noise=args.noise,
+        seed=args.seed,
+    ) as server:
+        EODHD.BASE = server.url
+        for t, *_ in tickers:
+            server.payload(t, EODHD.fundamental_params().get("filter"))
+
+        for n in range(1, args.repeat + 1):
+            if args.sink == "sqlite":
+                writer = SQLiteWriter(
+                    args.sqlite_path or os.path.join(tmp, "benchmark.db")
+                )
+            elif args.sink == "parquet":
+                ParquetWriter.PATH = os.path.join(tmp, "parquet")
+                writer = ParquetWriter()
+            else:
+                writer = MemoryWriter()
+            results.append(run(tickers, args.batch_size, writer))
+            report(n, results[-1])
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"args": vars(args), "runs": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Compares the threaded `Engine` with `AsyncEngine` against a local mock server.
+
+    python -m benchmark.engines --tickers 2000 --latency 0.05
+    python -m benchmark.engines --stall-rate 0.01 --stall 5  # hedging
+
+The threaded engine hedges at `--hedge-quantile`. Without stalls no request
+is slower than its peers by much, so a hedge there means requests were timed
+before they were sent, and the run fails.
+"""
+
+import argparse
+import time
+
+import benchmark  # noqa: F401
+from benchmark.mock_server import MockEODHDServer
+from client.async_engine import AsyncEngine
+from client.engine import Engine
+from client.eodhd import EODHD
+
+
+def measure(engine_cls, tickers, server):
+    engine = engine_cls(tickers)
+    sent = server.requests
+    start = time.perf_counter()
+    data = engine.run()
+    elapsed = time.perf_counter() - start
+    ok = sum(1 for v in data.values() if v)
+    return elapsed, ok, engine.hedged, server.requests - sent
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tickers", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--quarters", type=int, default=8)
+    parser.add_argument("--noise", type=int, default=20)
+    parser.add_argument("--stall-rate", type=float, default=0.0)
+    parser.add_argument("--stall", type=float, default=5.0)
+    parser.add_argument("--hedge-quantile", type=float, default=0.95)
+    args = parser.parse_args()
+
+    tickers = [(f"T{i}.US", f"T{i} US Equity", "USD") for i in range(args.tickers)]
+    AsyncEngine.CONCURRENCY = args.concurrency
+    Engine.HEDGE_QUANTILE = args.hedge_quantile
+
+    with MockEODHDServer(
+        latency=args.latency,
+        quarters=args.quarters,
+        noise=args.noise,
+        stall_rate=args.stall_rate,
+        stall=args.stall,
+    ) as server:
+        EODHD.BASE = server.url
+        for t, *_ in tickers:
+            server.payload(t)
+
+        for name, cls in (("thread", Engine), ("async", AsyncEngine)):
+            elapsed, ok, hedged, sent = measure(cls, tickers, server)
+            print(
+                f"{name:>7}: {ok}/{len(tickers)} tickers in {elapsed:.2f}s "
+                f"({len(tickers) / elapsed:.0f} req/s, {sent} requests, "
+                f"{hedged} hedged)"
+            )
+            if hedged and not args.stall_rate:
+                raise SystemExit(f"{name}: {hedged} request(s) hedged without stalls")
+
+
+if __name__ == "__main__":
+    main()
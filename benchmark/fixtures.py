@@ -0,0 +1,116 @@
+import random
+from datetime import date, timedelta
+
+from transformer.const import HIST_COLUMNS
+
+STATEMENT_FIELDS = [
+    c
+    for c in HIST_COLUMNS
+    if not c.startswith(("balance_sheet_", "cash_", "income_"))
+    and c
+    not in (
+        "eodhd_ticker",
+        "timestamp_created_utc",
+        "updated_at",
+        "Period",
+        "CurrencyCode",
+    )
+] + ["netIncome"]
+
+
+def generate_fundamentals(ticker, quarters=40, years=10, noise=200, seed=None):
+    """
+    Builds a synthetic fundamentals document shaped like the EODHD
+    `fundamentals/{ticker}` response. `noise` controls the size of the
+    sections the transformer never reads (Earnings, Holders, ...).
+    """
+    rnd = random.Random(seed if seed is not None else ticker)
+    today = date(2025, 12, 31)
+
+    def num():
+        return f"{rnd.uniform(-1e9, 1e9):.2f}"
+
+    def statements(count, step_days):
+        out = {}
+        for i in range(count):
+            d = (today - timedelta(days=step_days * i)).isoformat()
+            item = {"date": d, "filing_date": d, "currency_symbol": "USD"}
+            item.update({f: num() for f in STATEMENT_FIELDS})
+            out[d] = item
+        return out
+
+    def financial():
+        return {
+            "currency_symbol": "USD",
+            "quarterly": statements(quarters, 91),
+            "yearly": statements(years, 365),
+        }
+
+    return {
+        "General": {
+            "Code": ticker,
+            "UpdatedAt": today.isoformat(),
+            "CurrencyCode": "USD",
+            "Sector": "Technology",
+            "Industry": "Software",
+            "GicSector": "Information Technology",
+            "GicGroup": "Software & Services",
+            "GicIndustry": "Software",
+            "GicSubIndustry": "Application Software",
+            "Description": "x" * rnd.randint(200, 2000),
+            "AddressData": {
+                "Street": "1 Main St",
+                "City": "Springfield",
+                "State": "IL",
+                "Country": "USA",
+                "ZIP": "62701",
+            },
+        },
+        "Highlights": {
+            "MarketCapitalizationMln": rnd.uniform(1, 1e6),
+            "PERatio": rnd.uniform(1, 80),
+            "PEGRatio": rnd.uniform(0, 5),
+            "WallStreetTargetPrice": rnd.uniform(1, 500),
+            "BookValue": rnd.uniform(1, 100),
+            "DividendYield": rnd.uniform(0, 0.1),
+            "ProfitMargin": rnd.uniform(-1, 1),
+            "OperatingMarginTTM": rnd.uniform(-1, 1),
+            "ReturnOnAssetsTTM": rnd.uniform(-1, 1),
+            "ReturnOnEquityTTM": rnd.uniform(-1, 1),
+            "RevenueTTM": rnd.uniform(1e6, 1e11),
+            "RevenuePerShareTTM": rnd.uniform(1, 100),
+        },
+        "Valuation": {
+            "TrailingPE": rnd.uniform(1, 80),
+            "ForwardPE": rnd.uniform(1, 80),
+            "PriceSalesTTM": rnd.uniform(0, 20),
+            "PriceBookMRQ": rnd.uniform(0, 20),
+            "EnterpriseValue": rnd.uniform(1e6, 1e12),
+            "EnterpriseValueRevenue": rnd.uniform(0, 20),
+            "EnterpriseValueEbitda": rnd.uniform(0, 50),
+        },
+        "SplitsDividends": {
+            "ForwardAnnualDividendRate": rnd.uniform(0, 5),
+            "ForwardAnnualDividendYield": rnd.uniform(0, 0.1),
+            "PayoutRatio": rnd.uniform(0, 1),
+        },
+        "SharesStats": {"SharesOutstanding": rnd.randint(10**6, 10**10)},
+        "AnalystRatings": {"Rating": rnd.uniform(1, 5)},
+        "Earnings": {
+            "History": {
+                str(i): {"epsActual": rnd.random(), "epsEstimate": rnd.random()}
+                for i in range(noise)
+            }
+        },
+        "Holders": {
+            "Institutions": {
+                str(i): {"name": f"Fund {i}", "totalShares": rnd.random()}
+                for i in range(noise)
+            }
+        },
+        "Financials": {
+            "Balance_Sheet": financial(),
+            "Cash_Flow": financial(),
+            "Income_Statement": financial(),
+        },
+    }
@@ -0,0 +1,65 @@
+"""
+Measures insert throughput into a heap against a real SQL Server for a range
+of connection counts, using the MSSQL_* settings. A local container works:
+
+    docker run -e ACCEPT_EULA=Y -e MSSQL_SA_PASSWORD=Bench_pass1 \\
+        -p 1433:1433 -d mcr.microsoft.com/mssql/server:2022-latest
+    MSSQL_SERVER="localhost,1433;TrustServerCertificate=yes" \\
+    MSSQL_DATABASE=master MSSQL_USERNAME=sa MSSQL_PASSWORD=Bench_pass1 \\
+        python -m benchmark.inserts --tickers 5000 --workers 1 2 4 8
+"""
+
+import argparse
+import time
+
+import benchmark  # noqa: F401
+from benchmark.fixtures import generate_fundamentals
+from database.helper import init_db_instance
+from database.writer import TableWriter
+from transformer import Agent
+
+TABLE = "benchmark_inserts"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tickers", type=int, default=2000)
+    parser.add_argument("--quarters", type=int, default=8)
+    parser.add_argument("--table", choices=("summary", "hist"), default="hist")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--chunk-kb", type=int, nargs="+", default=[4096])
+    args = parser.parse_args()
+
+    data = {
+        f"T{i}.US": generate_fundamentals(f"T{i}.US", args.quarters, 2, seed=i)
+        for i in range(args.tickers)
+    }
+    summary, hist = Agent(data).transform().values()
+    df = summary if args.table == "summary" else hist
+
+    conn = init_db_instance()
+    conn.execute(f"DROP TABLE IF EXISTS {TABLE}")
+    conn.insert_table(
+        df.iloc[:1], TABLE, if_exists="replace", delete_prev_records=False
+    )
+
+    writer = TableWriter()
+    for kb in args.chunk_kb:
+        writer.CHUNK_BYTES = kb * 1024
+        chunk_size = writer.calculate_chunk_size(df)
+        for workers in args.workers:
+            conn.execute(f"TRUNCATE TABLE {TABLE}")
+            start = time.perf_counter()
+            ok = conn.insert_parallel(df, TABLE, chunk_size=chunk_size, workers=workers)
+            elapsed = time.perf_counter() - start
+            print(
+                f"{kb:>6} KB ({chunk_size} rows/chunk), {workers:>2} workers: "
+                f"{len(df)} rows in {elapsed:.2f}s ({len(df) / elapsed:.0f} rows/s)"
+                + ("" if ok else " FAILED")
+            )
+
+    conn.execute(f"DROP TABLE {TABLE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from benchmark.fixtures import generate_fundamentals
+
+
+class MockEODHDServer:
+    """
+    Local stand-in for the EODHD `fundamentals/{ticker}` endpoint. Tickers
+    starting with "MISSING" return 404; `error_rate` of requests return 503
+    and `stall_rate` of requests take `stall` extra seconds, drawn from a
+    generator seeded with `seed`.
+    """
+
+    def __init__(
+        self,
+        latency=0.0,
+        error_rate=0.0,
+        quarters=40,
+        years=10,
+        noise=200,
+        stall_rate=0.0,
+        stall=5.0,
+        seed=None,
+    ):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.stall_rate = stall_rate
+        self.stall = stall
+        self.quarters = quarters
+        self.years = years
+        self.noise = noise
+        self.requests = 0
+        self.random = random.Random(seed)
+        self._payloads = {}
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/api/"
+
+    def payload(self, ticker, fields=None):
+        key = (ticker, fields)
+        with self._lock:
+            if key not in self._payloads:
+                doc = generate_fundamentals(
+                    ticker, self.quarters, self.years, self.noise
+                )
+                if fields:
+                    doc = {f: self._select(doc, f) for f in fields.split(",")}
+                self._payloads[key] = json.dumps(doc).encode()
+            return self._payloads[key]
+
+    @staticmethod
+    def _select(doc, path):
+        for part in path.split("::"):
+            doc = doc.get(part, {}) if isinstance(doc, dict) else {}
+        return doc
+
+    def __enter__(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                with server._lock:
+                    server.requests += 1
+
+                if server.latency:
+                    time.sleep(server.latency)
+                if server.stall_rate and server.random.random() < server.stall_rate:
+                    time.sleep(server.stall)
+
+                url = urlsplit(self.path)
+                ticker = url.path.rstrip("/").split("/")[-1]
+                fields = parse_qs(url.query).get("filter", [None])[0]
+                if ticker.startswith("MISSING"):
+                    return self._reply(404, b"Ticker Not Found.")
+                if server.error_rate and server.random.random() < server.error_rate:
+                    return self._reply(503, b"Service Unavailable")
+                return self._reply(200, server.payload(ticker, fields))
+
+            def _reply(self, status, body):
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        ThreadingHTTPServer.request_queue_size = 1024
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,59 @@
+"""
+Per-ticker parse CPU and peak Python heap for the fundamentals decode paths.
+
+    python -m benchmark.parsing --quarters 80 --noise 5000
+"""
+
+import argparse
+import io
+import json
+import time
+import tracemalloc
+
+import benchmark  # noqa: F401
+from benchmark.fixtures import generate_fundamentals
+from client import parser
+
+
+def measure(func, body, repeat):
+    tracemalloc.start()
+    func(body)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(body)
+    return (time.perf_counter() - start) / repeat, peak
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--quarters", type=int, default=80)
+    arg_parser.add_argument("--years", type=int, default=20)
+    arg_parser.add_argument("--noise", type=int, default=5000)
+    arg_parser.add_argument("--repeat", type=int, default=10)
+    args = arg_parser.parse_args()
+
+    doc = generate_fundamentals("BENCH.US", args.quarters, args.years, args.noise)
+    body = json.dumps(doc).encode()
+    print(f"payload: {len(body) / 1024 / 1024:.2f} MB")
+
+    paths = {
+        "json.loads (full)": json.loads,
+        f"{parser.BACKEND} decode + select": parser.decode,
+    }
+    if parser.ijson is not None:
+        paths[f"ijson/{parser.ijson.backend} stream"] = lambda b: parser.decode_stream(
+            io.BytesIO(b)
+        )
+
+    for name, func in paths.items():
+        elapsed, peak = measure(func, body, args.repeat)
+        print(
+            f"{name:>32}: {elapsed * 1000:8.1f} ms  peak {peak / 1024 / 1024:7.2f} MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Agent throughput over a synthetic fundamentals corpus.
+
+    python -m benchmark.transform --tickers 1000
+"""
+
+import argparse
+import json
+import time
+
+import benchmark  # noqa: F401
+from benchmark.fixtures import generate_fundamentals
+from transformer import Agent
+
+
+def corpus(tickers, quarters, years):
+    return {
+        f"T{i}.US": generate_fundamentals(f"T{i}.US", quarters, years, noise=0)
+        for i in range(tickers)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tickers", type=int, default=1000)
+    parser.add_argument("--quarters", type=int, default=12)
+    parser.add_argument("--years", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument(
+        "--raw", action="store_true", help="feed raw JSON bodies, timing decoding"
+    )
+    args = parser.parse_args()
+    Agent.WORKERS = args.workers
+
+    data = corpus(args.tickers, args.quarters, args.years)
+    if args.raw:
+        data = {t: json.dumps(doc).encode() for t, doc in data.items()}
+    agent = Agent({})
+
+    def extract():
+        for ticker, fundamentals in data.items():
+            agent._parse_single_ticker_fundamentals(fundamentals, ticker)
+        return len(data)
+
+    def transform():
+        tables = Agent(data).transform()
+        return sum(len(df) for df in tables.values())
+
+    benches = [("full transform", transform)]
+    if not args.raw:
+        benches.insert(0, ("summary extraction", extract))
+
+    for name, func in benches:
+        best = None
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            rows = func()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+
+        print(f"{name:>18}: {rows} rows in {best:.3f}s ({rows / best:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
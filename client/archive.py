@@ -0,0 +1,130 @@
+import mmap
+import os
+import threading
+import zlib
+from datetime import datetime
+
+from config import logger, settings
+from metrics import ARCHIVE_BYTES
+
+
+class ResponseArchive:
+    """
+    Append-only archive of raw fundamentals responses. Each body is
+    zlib-compressed on its own and appended to the data file, and a line of
+    `ticker<TAB>offset<TAB>length` is appended to the `.idx` file next to it,
+    so one ticker's payload can be read through a memory map without reading
+    the rest. A ticker archived twice resolves to its latest record.
+
+    Index lines are written after their record, so a run killed mid-write
+    leaves at most an unindexed tail, which is ignored.
+    """
+
+    COMPRESSION_LEVEL = 6
+    INDEX_SUFFIX = ".idx"
+
+    def __init__(self, path):
+        self.path = path
+        self.index = {}
+        self._lock = threading.Lock()
+        self._data = None
+        self._index_file = None
+        self._map = None
+        self._load_index()
+
+    def _load_index(self):
+        if not os.path.exists(self.path + self.INDEX_SUFFIX):
+            return
+
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        with open(self.path + self.INDEX_SUFFIX) as f:
+            for line in f:
+                if not line.endswith("\n"):
+                    break
+                ticker, offset, length = line.rstrip("\n").split("\t")
+                offset, length = int(offset), int(length)
+                if offset + length <= size:
+                    self.index[ticker] = (offset, length)
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, ticker):
+        return ticker in self.index
+
+    def append(self, ticker, body):
+        payload = zlib.compress(body, self.COMPRESSION_LEVEL)
+        with self._lock:
+            if self._data is None:
+                self._data = open(self.path, "ab")
+                self._index_file = open(self.path + self.INDEX_SUFFIX, "a")
+
+            offset = self._data.seek(0, os.SEEK_END)
+            self._data.write(payload)
+            self._data.flush()
+            self._index_file.write(f"{ticker}\t{offset}\t{len(payload)}\n")
+            self._index_file.flush()
+            self.index[ticker] = (offset, len(payload))
+        ARCHIVE_BYTES.inc(len(payload))
+
+    def get(self, ticker):
+        """Raw body archived for `ticker`, or None."""
+        entry = self.index.get(ticker)
+        if entry is None:
+            return None
+
+        offset, length = entry
+        return zlib.decompress(self._mapped(offset + length)[offset : offset + length])
+
+    def items(self, tickers=None):
+        """
+        Yields (ticker, raw body) for `tickers` (default all) in file order,
+        so a full pass reads the data file sequentially.
+        """
+        names = self.index if tickers is None else tickers
+        entries = sorted((self.index[t], t) for t in names if t in self.index)
+        for (offset, length), ticker in entries:
+            mapped = self._mapped(offset + length)
+            yield ticker, zlib.decompress(mapped[offset : offset + length])
+
+    def _mapped(self, end):
+        """Memory map of the data file, remapped once it no longer covers `end`."""
+        with self._lock:
+            if self._map is None or len(self._map) < end:
+                if self._data is not None:
+                    self._data.flush()
+                # The old map is left to the GC, as readers may still use it
+                with open(self.path, "rb") as f:
+                    self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            return self._map
+
+    def close(self):
+        with self._lock:
+            for handle in (self._data, self._index_file, self._map):
+                if handle is not None:
+                    handle.close()
+            self._data = self._index_file = self._map = None
+
+
+_archive = None
+_archive_lock = threading.Lock()
+
+
+def get_response_archive():
+    """
+    Archive every response of this process is appended to: one file per UTC
+    day under ARCHIVE_PATH, so a resumed or repeated run extends that day's
+    archive.
+    """
+    global _archive
+    if not settings.ARCHIVE_PATH:
+        return None
+
+    with _archive_lock:
+        if _archive is None:
+            os.makedirs(settings.ARCHIVE_PATH, exist_ok=True)
+            day = datetime.utcnow().date().isoformat()
+            path = os.path.join(settings.ARCHIVE_PATH, f"fundamentals-{day}.arc")
+            _archive = ResponseArchive(path)
+            logger.debug(f"Archiving responses to {path} ({len(_archive)} indexed).")
+        return _archive
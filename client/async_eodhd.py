@@ -0,0 +1,99 @@
+import asyncio
+
+import aiohttp
+
+from client import parser
+from client.archive import get_response_archive
+from client.cache import get_response_cache
+from client.eodhd import EODHD
+from client.ratelimit import get_rate_limiter
+from config import logger, settings
+from metrics import RESPONSE_BYTES, RETRIES, THROTTLED
+
+
+class AsyncEODHD(EODHD):
+    """
+    Non-blocking counterpart of `EODHD` sharing one pooled aiohttp session.
+    Mirrors the retry policy of `client.request.init_session`, retries being
+    charged to the rate limiter too.
+    """
+
+    RETRY_STATUSES = (500, 502, 503, 504, 429)
+
+    def __init__(self, token, session):
+        self.token = token
+        self.session = session
+        self.limiter = get_rate_limiter()
+        self.cache = get_response_cache()
+        self.archive = get_response_archive()
+        self.max_retries = settings.REQUEST_MAX_RETRIES
+        self.backoff_factor = settings.REQUEST_BACKOFF_FACTOR
+
+    async def request(self, method, *args, **kwargs):
+        self._prepare(kwargs)
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self.session.request(method, *args, **kwargs) as response:
+                    if response.status == 404:
+                        raise ValueError("Symbol not found on EODHD API")
+                    if response.status == 429:
+                        THROTTLED.inc()
+
+                    if (
+                        response.status in self.RETRY_STATUSES
+                        and attempt < self.max_retries
+                    ):
+                        await self._retry(attempt, str(response.status))
+                        continue
+
+                    response.raise_for_status()
+                    body = await response.read()
+                    RESPONSE_BYTES.inc(len(body))
+                    return body
+            except aiohttp.ClientError as e:
+                if attempt < self.max_retries and not isinstance(
+                    e, aiohttp.ClientResponseError
+                ):
+                    await self._retry(attempt, "error")
+                    continue
+                logger.error(f"Request failed for {args[0]}: {str(e)}")
+                raise
+
+    async def get_fundamental(self, ticker):
+        body = await asyncio.to_thread(self._from_cache, ticker)
+        if body is not None:
+            await asyncio.to_thread(self._to_archive, ticker, body)
+            return parser.decode(body)
+
+        await self.limiter.acquire_async(settings.FUNDAMENTALS_CALL_COST)
+        body = await self.request(
+            "get",
+            self.fundamental_url(ticker),
+            params=self.fundamental_params(self.archive is None),
+        )
+        data = parser.decode(body)
+        await asyncio.to_thread(self._to_cache, ticker, body, data)
+        await asyncio.to_thread(self._to_archive, ticker, body)
+        return data
+
+    async def get_fundamental_body(self, ticker):
+        body = await asyncio.to_thread(self._from_cache, ticker)
+        if body is None:
+            await self.limiter.acquire_async(settings.FUNDAMENTALS_CALL_COST)
+            body = await self.request(
+                "get",
+                self.fundamental_url(ticker),
+                params=self.fundamental_params(self.archive is None),
+            )
+            await asyncio.to_thread(self._to_cache, ticker, body)
+        await asyncio.to_thread(self._to_archive, ticker, body)
+        return body
+
+    async def _retry(self, attempt, status):
+        RETRIES.inc(status=status)
+        await asyncio.sleep(self._backoff(attempt))
+        await self.limiter.acquire_async(settings.FUNDAMENTALS_CALL_COST)
+
+    def _backoff(self, attempt):
+        return self.backoff_factor * (2**attempt)
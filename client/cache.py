@@ -0,0 +1,135 @@
+import sqlite3
+import threading
+import time
+import zlib
+
+from config import logger, settings
+from metrics import CACHE_REQUESTS
+
+
+class ResponseCache:
+    """
+    Persistent store of raw fundamentals responses in a SQLite file, kept as
+    zlib-compressed blobs keyed on ticker. Entries older than `ttl` seconds
+    are misses (unless `offline`), and once the stored size passes `max_bytes`
+    the least recently used entries are evicted.
+    """
+
+    COMPRESSION_LEVEL = 6
+
+    def __init__(self, path, ttl, max_bytes, offline=False):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.cnx = sqlite3.connect(path, check_same_thread=False)
+        self.cnx.execute("PRAGMA journal_mode=WAL")
+        self.cnx.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "ticker TEXT PRIMARY KEY, updated_at TEXT, fetched_at REAL, "
+            "accessed_at REAL, size INTEGER, payload BLOB)"
+        )
+        self.cnx.commit()
+        self.size = self.cnx.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+
+    def get(self, ticker):
+        with self._lock:
+            row = self.cnx.execute(
+                "SELECT fetched_at, payload FROM responses WHERE ticker = ?",
+                (ticker,),
+            ).fetchone()
+            now = time.time()
+            if row is None or (not self.offline and now - row[0] > self.ttl):
+                self.misses += 1
+                CACHE_REQUESTS.inc(result="miss")
+                return None
+
+            self.cnx.execute(
+                "UPDATE responses SET accessed_at = ? WHERE ticker = ?", (now, ticker)
+            )
+            self.cnx.commit()
+            self.hits += 1
+            CACHE_REQUESTS.inc(result="hit")
+        return zlib.decompress(row[1])
+
+    def tickers(self):
+        with self._lock:
+            return [
+                r[0]
+                for r in self.cnx.execute(
+                    "SELECT ticker FROM responses ORDER BY ticker"
+                )
+            ]
+
+    def items(self, tickers=None):
+        """
+        Yields (ticker, raw body) for `tickers` (default all), regardless of
+        age and without counting as hits or refreshing recency.
+        """
+        for ticker in self.tickers() if tickers is None else tickers:
+            with self._lock:
+                row = self.cnx.execute(
+                    "SELECT payload FROM responses WHERE ticker = ?", (ticker,)
+                ).fetchone()
+            if row is not None:
+                yield ticker, zlib.decompress(row[0])
+
+    def put(self, ticker, body, updated_at=None):
+        payload = zlib.compress(body, self.COMPRESSION_LEVEL)
+        now = time.time()
+        with self._lock:
+            prev = self.cnx.execute(
+                "SELECT size FROM responses WHERE ticker = ?", (ticker,)
+            ).fetchone()
+            self.cnx.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (ticker, updated_at, now, now, len(payload), payload),
+            )
+            self.size += len(payload) - (prev[0] if prev else 0)
+            if self.size > self.max_bytes:
+                self._evict()
+            self.cnx.commit()
+
+    def _evict(self):
+        target = int(self.max_bytes * 0.9)
+        cursor = self.cnx.execute(
+            "SELECT ticker, size FROM responses ORDER BY accessed_at"
+        )
+        victims = []
+        for ticker, size in cursor:
+            if self.size <= target:
+                break
+            victims.append((ticker,))
+            self.size -= size
+
+        self.cnx.executemany("DELETE FROM responses WHERE ticker = ?", victims)
+        logger.debug(f"Response cache evicted {len(victims)} entries.")
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    global _cache
+    if not settings.CACHE_PATH:
+        return None
+
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache(
+                settings.CACHE_PATH,
+                ttl=settings.CACHE_TTL_HOURS * 3600,
+                max_bytes=settings.CACHE_MAX_MB * 1024 * 1024,
+                offline=settings.CACHE_OFFLINE,
+            )
+            logger.debug(
+                f"Response cache at {settings.CACHE_PATH} holds "
+                f"{_cache.size / 1024 / 1024:.1f} MB."
+            )
+        return _cache
@@ -0,0 +1,90 @@
+import threading
+
+from config import logger, settings
+from metrics import CONCURRENCY
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD limit on requests in flight. Every `window` finished requests the
+    limit grows by one while the window's p95 latency stays under
+    `target_latency` and its error rate under `max_error_rate`, and is cut by
+    `backoff` as soon as either is exceeded, within [min_limit, max_limit].
+    """
+
+    def __init__(
+        self,
+        min_limit,
+        max_limit,
+        initial,
+        target_latency,
+        max_error_rate,
+        window=20,
+        backoff=0.7,
+    ):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = min(max(initial, self.min_limit), self.max_limit)
+        self.target_latency = target_latency
+        self.max_error_rate = max_error_rate
+        self.window = window
+        self.backoff = backoff
+        self.in_flight = 0
+        self.p95 = 0.0
+        self.error_rate = 0.0
+        self._samples = []
+        self._cond = threading.Condition()
+        CONCURRENCY.set(self.limit)
+
+    def acquire(self):
+        with self._cond:
+            while self.in_flight >= self.limit:
+                self._cond.wait()
+            self.in_flight += 1
+
+    def release(self, latency=None, error=False):
+        """Frees a slot; without `latency`, no request was sent to sample."""
+        with self._cond:
+            self.in_flight -= 1
+            if latency is not None:
+                self._samples.append((latency, error))
+                if len(self._samples) >= self.window:
+                    self._adjust()
+            self._cond.notify_all()
+
+    def _adjust(self):
+        latencies = sorted(s[0] for s in self._samples)
+        self.p95 = latencies[int(0.95 * (len(latencies) - 1))]
+        self.error_rate = sum(s[1] for s in self._samples) / len(self._samples)
+        self._samples = []
+
+        previous = self.limit
+        if self.p95 > self.target_latency or self.error_rate > self.max_error_rate:
+            self.limit = max(self.min_limit, int(self.limit * self.backoff))
+        else:
+            self.limit = min(self.max_limit, self.limit + 1)
+
+        CONCURRENCY.set(self.limit)
+        if self.limit != previous:
+            logger.debug(
+                f"Concurrency {previous} -> {self.limit} "
+                f"(p95 {self.p95:.2f}s, errors {self.error_rate:.0%})."
+            )
+
+
+_controller = None
+_controller_lock = threading.Lock()
+
+
+def get_concurrency_controller():
+    global _controller
+    with _controller_lock:
+        if _controller is None:
+            _controller = AdaptiveConcurrency(
+                min_limit=settings.CLIENT_MIN_THREADS,
+                max_limit=settings.CLIENT_MAX_THREADS,
+                initial=settings.CLIENT_THREADS,
+                target_latency=settings.CLIENT_TARGET_P95_MS / 1000,
+                max_error_rate=settings.CLIENT_MAX_ERROR_RATE,
+            )
+        return _controller
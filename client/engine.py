@@ -1,48 +1,235 @@
+import queue
 import threading
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
 
+from client.concurrency import get_concurrency_controller
 from client.eodhd import EODHD
+from client.ratelimit import QuotaExhausted
 from config import logger, settings
+from metrics import FETCH_SECONDS, HEDGED, span
+
+# Outcome of one ticker's fetch: "ok", "not_found" or "error", and seconds taken.
+# Tickers the deadline or the daily quota kept from being fetched get none.
+FetchStatus = namedtuple("FetchStatus", ["status", "latency"])
 
 
 class Engine:
+    """
+    Fetches fundamentals for a batch of tickers with a pool of worker
+    threads, whose requests in flight are sized by the shared
+    `AdaptiveConcurrency` controller.
+
+    Once `HEDGE_MIN_SAMPLES` tickers have finished, a request still pending
+    after the `HEDGE_QUANTILE` latency of recent ones, and after at least
+    `HEDGE_MIN_FACTOR` times their median, gets a duplicate "hedged" request,
+    and whichever answers first is delivered. The floor keeps ordinary jitter
+    from being hedged when no request is actually stuck. Workers stop
+    taking tickers after `deadline` (a `time.monotonic()` value).
+    """
 
     TOKEN = settings.TOKEN
-    THREAD_COUNT = 10
+    HEDGE_QUANTILE = settings.HEDGE_QUANTILE
+    HEDGE_WORKERS = settings.HEDGE_WORKERS
+    HEDGE_MIN_SAMPLES = 20
+    HEDGE_MIN_FACTOR = 3
+    HEDGE_INTERVAL = 0.1
 
-    def __init__(self, tickers):
+    def __init__(self, tickers, on_result=None, raw=False, deadline=None):
         self.on = True
         self.data = {}
+        self.status = {}
+        self.on_result = on_result
+        self.raw = raw
+        self.deadline = deadline
+        self.hedged = 0
         self.eodhd = EODHD(self.TOKEN)
+        # Shared across engines, so the limit it settles on carries over
+        # from one batch to the next.
+        self.concurrency = get_concurrency_controller()
+        self._claimed = set()
+        # ticker -> send time of its first request, until it is finished
+        self._inflight = {}
+        self._finished = set()
+        self._hedges = set()
+        self._latencies = deque(maxlen=200)
+        self._lock = threading.Lock()
+        self._done = threading.Event()
         self._parse_tickers(tickers)
 
     def run(self):
-        self.queue = self.tickers.copy()
+        self.queue = queue.SimpleQueue()
+        for ticker in dict.fromkeys(self.tickers):
+            if ticker not in ["", None]:
+                self.queue.put(ticker)
+        self._pending = self.queue.qsize()
+        if not self._pending:
+            return self.data
+
         threads = []
-        for _ in range(self.THREAD_COUNT):
-            t = threading.Thread(target=self._worker)
+        for _ in range(min(self.concurrency.max_limit, self._pending)):
+            t = threading.Thread(target=self._worker, daemon=True)
             threads.append(t)
             t.start()
 
-        for t in threads:
-            t.join()
+        hedger = None
+        if self.HEDGE_QUANTILE:
+            hedger = ThreadPoolExecutor(max_workers=self.HEDGE_WORKERS)
+            threading.Thread(
+                target=self._hedge_loop, args=(hedger,), daemon=True
+            ).start()
+
+        # A worker whose request lost to its hedge may still be waiting on the
+        # read timeout, so wait for the tickers rather than the threads.
+        while not self._done.wait(self.HEDGE_INTERVAL):
+            if not any(t.is_alive() for t in threads):
+                break
 
         self.on = False
+        self._done.set()
+        if hedger is not None:
+            hedger.shutdown(wait=False, cancel_futures=True)
+        if self._pending:
+            reason = "run deadline reached" if self.past_deadline() else "stopped"
+            logger.warning(f"Engine {reason} with {self._pending} ticker(s) unfetched.")
         return self.data
 
+    def past_deadline(self):
+        return self.deadline is not None and time.monotonic() > self.deadline
+
     def _worker(self):
-        while self.on and len(self.queue):
-            ticker = self.queue.pop(0)
-            if ticker in self.data or ticker in ["", None]:
+        while self.on:
+            if self.past_deadline():
+                return
+
+            try:
+                ticker = self.queue.get_nowait()
+            except queue.Empty:
+                return
+
+            if not self._claim(ticker):
                 continue
 
-            self.data[ticker] = None
+            # Latency, and so hedging, only covers requests actually sent:
+            # waiting on the concurrency limit or the rate limiter is left out.
+            self.concurrency.acquire()
+            if not self.on:
+                # Stopped while waiting for a slot; the ticker stays unfetched
+                self.concurrency.release()
+                return
 
-            try:
-                self.data[ticker] = self.eodhd.get_fundamental(ticker)
-            except ValueError:
-                pass
-            except Exception:
-                logger.error(f"Error fetching dividends data for {ticker}")
+            start = time.perf_counter()
+            fundamentals, status = self._fetch(ticker, on_send=self._sent)
+            if status is None:
+                self.concurrency.release()
+                return
+            self.concurrency.release(time.perf_counter() - start, status == "error")
+            self._finish(ticker, fundamentals, status, start)
+
+    def _claim(self, ticker):
+        """Reserves `ticker` for the calling worker unless it was taken before."""
+        with self._lock:
+            if ticker in self._claimed:
+                return False
+            self._claimed.add(ticker)
+            return True
+
+    def _sent(self, ticker):
+        """Marks the first request for `ticker` as in flight from now on."""
+        with self._lock:
+            self._inflight.setdefault(ticker, time.perf_counter())
+
+    def _fetch(self, ticker, on_send=None):
+        """
+        (fundamentals, status) of one request. Once the daily quota is spent
+        the status is None: nothing was fetched, so the ticker gets no outcome
+        and stays unfetched.
+        """
+        try:
+            with span("fetch", ticker=ticker):
+                if self.raw:
+                    body = self.eodhd.get_fundamental_body(ticker, on_send=on_send)
+                    return body, "ok"
+                return self.eodhd.get_fundamental(ticker, on_send=on_send), "ok"
+        except QuotaExhausted as e:
+            if self.on:
+                logger.error(f"{e}; stopping engine.")
+            self.on = False
+            return None, None
+        except ValueError:
+            return None, "not_found"
+        except Exception:
+            logger.error(f"Error fetching fundamentals data for {ticker}")
+        return None, "error"
+
+    def _finish(self, ticker, fundamentals, status, start=None):
+        """
+        Delivers the first outcome for `ticker`; later ones are dropped. Its
+        latency runs from when the request was sent, or from `start` when it
+        was answered without one (from the response cache).
+        """
+        with self._lock:
+            if ticker in self._finished:
+                return
+            self._finished.add(ticker)
+            start = self._inflight.pop(ticker, start)
+            latency = time.perf_counter() - start
+            self._latencies.append(latency)
+
+        self.status[ticker] = FetchStatus(status, latency)
+        FETCH_SECONDS.observe(latency, status=status)
+        self._deliver(ticker, fundamentals)
+
+        # Only count the ticker done once delivered, so run() never returns
+        # while a callback is still handing over the last result.
+        with self._lock:
+            self._pending -= 1
+            if not self._pending:
+                self._done.set()
+
+    def _hedge_loop(self, executor):
+        while not self._done.wait(self.HEDGE_INTERVAL):
+            with self._lock:
+                if len(self._latencies) < self.HEDGE_MIN_SAMPLES:
+                    continue
+                latencies = sorted(self._latencies)
+                threshold = max(
+                    latencies[int(self.HEDGE_QUANTILE * (len(latencies) - 1))],
+                    latencies[len(latencies) // 2] * self.HEDGE_MIN_FACTOR,
+                )
+                now = time.perf_counter()
+                stragglers = [
+                    t
+                    for t, start in self._inflight.items()
+                    if now - start > threshold and t not in self._hedges
+                ]
+                self._hedges.update(stragglers)
+
+            for ticker in stragglers:
+                self.hedged += 1
+                HEDGED.inc()
+                executor.submit(self._hedge, ticker)
+
+    def _hedge(self, ticker):
+        fundamentals, status = self._fetch(ticker)
+        # A failed hedge leaves the original request to finish the ticker.
+        if status not in ("error", None):
+            self._finish(ticker, fundamentals, status)
+
+    def _deliver(self, ticker, fundamentals):
+        """
+        Hands a finished ticker to `on_result` when set, so the raw document
+        can be dropped right away; otherwise keeps it in `data`.
+        """
+        if self.on_result is None:
+            self.data[ticker] = fundamentals
+            return
+
+        try:
+            self.on_result(ticker, fundamentals)
+        except Exception as e:
+            logger.error(f"Error processing fundamentals data for {ticker}: {e}")
 
     def _parse_tickers(self, tickers):
         self.tickers = [x[0] for x in tickers]
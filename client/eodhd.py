@@ -1,36 +1,50 @@
+import logging
 from urllib.parse import urljoin
 
 import requests
 
+from client import parser
+from client.archive import get_response_archive
+from client.cache import get_response_cache
+from client.ratelimit import get_rate_limiter
 from client.request import init_session
 from config import logger, settings
+from metrics import RESPONSE_BYTES, RETRIES, THROTTLED
+from transformer.const import SOURCE_FIELDS
+
+FUNDAMENTALS_FILTER = ",".join(
+    f"{section}::{field}"
+    for section, fields in SOURCE_FIELDS.items()
+    for field in fields
+)
 
 
 class EODHD:
 
-    BASE = "https://eodhistoricaldata.com/api/"
+    BASE = settings.EODHD_BASE_URL
+    # (connect, read) seconds; the read timeout bounds each wait for data.
+    TIMEOUT = (settings.REQUEST_CONNECT_TIMEOUT, settings.REQUEST_READ_TIMEOUT)
 
     def __init__(self, token):
         self.token = token
+        self.limiter = get_rate_limiter()
         self.session = init_session(
-            settings.REQUEST_MAX_RETRIES, settings.REQUEST_BACKOFF_FACTOR
+            settings.REQUEST_MAX_RETRIES,
+            settings.REQUEST_BACKOFF_FACTOR,
+            pool_size=settings.CLIENT_MAX_THREADS + settings.HEDGE_WORKERS,
+            limiter=self.limiter,
+            cost=settings.FUNDAMENTALS_CALL_COST,
         )
+        self.cache = get_response_cache()
+        self.archive = get_response_archive()
 
     def request(self, method, *args, **kwargs):
-        headers = {
-            "Accept": "*/*",
-            "Content-Type": "application/json",
-        }
-        kwargs["headers"] = headers
-        if "params" not in kwargs:
-            kwargs["params"] = {}
-
-        kwargs["params"].update(self.params)
-        logger.debug(f"Request headers: {headers}")
-        logger.debug(f"Request parameters: {kwargs['params']}")
+        self._prepare(kwargs)
+        kwargs.setdefault("timeout", self.TIMEOUT)
 
         try:
             response = self.session.request(method, *args, **kwargs)
+            self._count_retries(response)
             if response.status_code == 404:
                 raise ValueError("Symbol not found on EODHD API")
 
@@ -40,12 +54,137 @@ class EODHD:
             logger.error(f"Request failed for {args[0]}: {str(e)}")
             raise
 
-    def get_fundamental(self, ticker):
-        url = urljoin(self.BASE, f"fundamentals/{ticker}")
-        resp = self.request("get", url)
-        return resp.json()
+    @staticmethod
+    def _count_retries(response):
+        retries = getattr(response.raw, "retries", None)
+        for attempt in retries.history if retries else ():
+            RETRIES.inc(status=str(attempt.status or "error"))
+            if attempt.status == 429:
+                THROTTLED.inc()
+        if response.status_code == 429:
+            THROTTLED.inc()
+
+    def get_fundamental(self, ticker, on_send=None):
+        """
+        Decoded fundamentals for `ticker`. `on_send(ticker)` is called once
+        the rate limiter lets the request go, i.e. not for cached responses.
+        """
+        body = self._from_cache(ticker)
+        if body is not None:
+            self._to_archive(ticker, body)
+            return parser.decode(body)
+
+        self.limiter.acquire(settings.FUNDAMENTALS_CALL_COST)
+        if on_send is not None:
+            on_send(ticker)
+        stream = self.streaming
+        resp = self.request(
+            "get",
+            self.fundamental_url(ticker),
+            params=self.fundamental_params(self.archive is None),
+            stream=stream,
+        )
+        if stream:
+            resp.raw.decode_content = True
+            with resp:
+                data = parser.decode_stream(resp.raw)
+                RESPONSE_BYTES.inc(resp.raw.tell())
+                return data
+
+        RESPONSE_BYTES.inc(len(resp.content))
+        data = parser.decode(resp.content)
+        self._to_cache(ticker, resp.content, data)
+        self._to_archive(ticker, resp.content)
+        return data
+
+    def get_fundamental_body(self, ticker, on_send=None):
+        """Returns the raw response body, leaving decoding to the caller."""
+        body = self._from_cache(ticker)
+        if body is None:
+            self.limiter.acquire(settings.FUNDAMENTALS_CALL_COST)
+            if on_send is not None:
+                on_send(ticker)
+            body = self.request(
+                "get",
+                self.fundamental_url(ticker),
+                params=self.fundamental_params(self.archive is None),
+            ).content
+            RESPONSE_BYTES.inc(len(body))
+            self._to_cache(ticker, body)
+        self._to_archive(ticker, body)
+        return body
+
+    @property
+    def streaming(self):
+        # The cache and archive need the raw body, so streaming only applies
+        # without them.
+        return (
+            settings.JSON_STREAMING
+            and parser.ijson is not None
+            and self.cache is None
+            and self.archive is None
+        )
+
+    @staticmethod
+    def fundamental_params(filtered=True):
+        """
+        Query parameters of a fundamentals request. While archiving, requests
+        are sent unfiltered, so the archive keeps whole documents that can be
+        replayed after fields are added to the mapping.
+        """
+        if not (filtered and settings.REQUEST_FIELD_FILTER):
+            return {}
+        return {"filter": FUNDAMENTALS_FILTER}
+
+    def _from_cache(self, ticker):
+        if self.cache is None:
+            return None
+
+        body = self.cache.get(ticker)
+        if body is None and self.cache.offline:
+            raise ValueError("Symbol not found in offline response cache")
+        if (
+            body is not None
+            and self.archive is not None
+            and not self.cache.offline
+            and parser.filtered(body)
+        ):
+            # Cached before archiving started; fetch the whole document instead
+            return None
+        return body
+
+    def _to_cache(self, ticker, body, data=None):
+        if self.cache is not None:
+            updated_at = None
+            if isinstance(data, dict):
+                updated_at = (data.get("General") or {}).get("UpdatedAt")
+            self.cache.put(ticker, body, updated_at)
+
+    def _to_archive(self, ticker, body):
+        if self.archive is None:
+            return
+        if parser.filtered(body):
+            logger.warning(f"Not archiving the filtered cached response of {ticker}.")
+            return
+        self.archive.append(ticker, body)
+
+    def fundamental_url(self, ticker):
+        return urljoin(self.BASE, f"fundamentals/{ticker}")
+
+    def _prepare(self, kwargs):
+        headers = {
+            "Accept": "*/*",
+            "Content-Type": "application/json",
+        }
+        kwargs["headers"] = headers
+        if "params" not in kwargs:
+            kwargs["params"] = {}
+
+        kwargs["params"].update(self.params)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Request headers: {headers}")
+            logger.debug(f"Request parameters: {kwargs['params']}")
 
     @property
     def params(self):
-        logger.debug("Generating request parameters with API token.")
         return {"api_token": self.token, "fmt": "json"}
@@ -0,0 +1,11 @@
+from client.engine import Engine
+from config import settings
+
+
+def init_engine(tickers, on_result=None, raw=False, deadline=None):
+    if settings.CLIENT_ENGINE == "async":
+        from client.async_engine import AsyncEngine
+
+        return AsyncEngine(tickers, on_result, raw, deadline)
+
+    return Engine(tickers, on_result, raw, deadline)
@@ -0,0 +1,127 @@
+import hashlib
+import json
+import time
+
+from metrics import DECODE_SECONDS
+from transformer.const import SOURCE_FIELDS
+
+try:
+    import orjson
+
+    BACKEND, loads = "orjson", orjson.loads
+
+    def _canonical(data):
+        return orjson.dumps(data, option=orjson.OPT_SORT_KEYS)
+
+except ImportError:  # pragma: no cover - depends on the environment
+    try:
+        import msgspec
+
+        BACKEND, loads = "msgspec", msgspec.json.Decoder().decode
+    except ImportError:
+        BACKEND, loads = "json", json.loads
+
+    def _canonical(data):
+        return json.dumps(data, sort_keys=True, separators=(",", ":")).encode()
+
+
+try:
+    import ijson
+except ImportError:  # pragma: no cover - depends on the environment
+    ijson = None
+
+# ijson prefixes of every subtree Agent reads, for both the full document
+# ("General.Sector") and the flat filtered form ("General::Sector").
+_WANTED = {}
+for _section, _fields in SOURCE_FIELDS.items():
+    for _field in _fields:
+        _WANTED[f"{_section}.{_field}"] = (_section, _field)
+        _WANTED[f"{_section}::{_field}"] = (_section, _field)
+
+_SCALARS = ("string", "number", "boolean", "null")
+
+
+def filtered(body):
+    """
+    Whether `body` answers a field-filtered request, whose keys are flat
+    "Section::Field" paths instead of nested sections. Only the first key is
+    looked at.
+    """
+    head = bytes(body[:256]).lstrip()
+    end = head.find(b'"', 2)
+    return head.startswith(b'{"') and end != -1 and b"::" in head[2:end]
+
+
+def decode(body):
+    """Parses a whole fundamentals body and keeps only the fields Agent reads."""
+    start = time.perf_counter()
+    data = loads(body)
+    if not isinstance(data, dict):
+        return data
+
+    selected = {}
+    for key, val in data.items():
+        if "::" in key:
+            _assign(selected, _WANTED.get(key), val)
+        elif key in SOURCE_FIELDS and isinstance(val, dict):
+            for field in SOURCE_FIELDS[key]:
+                if field in val:
+                    _assign(selected, (key, field), val[field])
+    DECODE_SECONDS.observe(time.perf_counter() - start, mode="full")
+    return selected
+
+
+def decode_stream(fileobj):
+    """
+    Parses a fundamentals body incrementally while it is read from `fileobj`,
+    materializing only the subtrees Agent reads; everything else (Earnings,
+    Holders, ...) is skipped event by event and never built as Python objects.
+    """
+    start = time.perf_counter()
+    selected = {}
+    path = builder = None
+    depth = 0
+
+    for prefix, event, value in ijson.parse(fileobj, use_float=True):
+        if builder is not None:
+            builder.event(event, value)
+            if event in ("start_map", "start_array"):
+                depth += 1
+            elif event in ("end_map", "end_array"):
+                depth -= 1
+                if depth == 0:
+                    _assign(selected, path, builder.value)
+                    builder = None
+            continue
+
+        path = _WANTED.get(prefix)
+        if path is None or event == "map_key":
+            continue
+
+        if event in _SCALARS:
+            _assign(selected, path, value)
+        elif event in ("start_map", "start_array"):
+            builder = ijson.ObjectBuilder()
+            builder.event(event, value)
+            depth = 1
+
+    # Includes the time spent reading the body from the network.
+    DECODE_SECONDS.observe(time.perf_counter() - start, mode="stream")
+    return selected
+
+
+def digest(payload):
+    """
+    Content hash of a fetched payload: of the body itself for raw bytes, or of
+    a key-sorted serialization of a decoded document.
+    """
+    if not isinstance(payload, (bytes, bytearray)):
+        payload = _canonical(payload)
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+
+def _assign(target, path, val):
+    if path is None:
+        return
+    section, field = path
+    target.setdefault(section, {})[field] = val
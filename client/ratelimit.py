@@ -0,0 +1,117 @@
+import asyncio
+import threading
+import time
+from datetime import datetime, timezone
+
+from config import logger, settings
+from metrics import RATE_LIMIT_WAIT
+from pipeline.checkpoint import get_checkpoint
+
+
+class QuotaExhausted(Exception):
+    pass
+
+
+class RateLimiter:
+    """
+    Client-side token buckets (per second / per minute) plus a daily call
+    budget, shared by every engine worker so requests are paced below the
+    EODHD limits instead of backing off after a 429.
+
+    Buckets count requests; the daily budget counts API calls, so a
+    fundamentals request is charged its `cost` (10 calls on EODHD), retries
+    included. Callers reserve capacity under a short lock and then sleep
+    outside it, which works the same for threads (`acquire`) and tasks
+    (`acquire_async`).
+
+    With a `store` (the run checkpoint), calls are also counted per day in
+    its file, so a restarted or resumed process picks up the day's count
+    instead of starting the budget over.
+    """
+
+    def __init__(self, per_second=0, per_minute=0, daily_budget=0, store=None):
+        self._lock = threading.Lock()
+        self._buckets = []
+        for rate, capacity in ((per_second, per_second), (per_minute / 60, per_minute)):
+            if rate > 0:
+                self._buckets.append([rate, capacity, float(capacity)])
+
+        self.daily_budget = daily_budget
+        self.store = store
+        self.waited = 0.0
+        self._day = self._today()
+        self.calls_today = self._calls(self._day)
+        self._last = time.monotonic()
+
+    def _calls(self, day):
+        return self.store.calls(day.isoformat()) if self.store else 0
+
+    def acquire(self, cost=1):
+        delay = self._reserve(cost)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    async def acquire_async(self, cost=1):
+        delay = self._reserve(cost)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return delay
+
+    def _reserve(self, cost):
+        with self._lock:
+            today = self._today()
+            if today != self._day:
+                self._day, self.calls_today = today, self._calls(today)
+
+            if self.daily_budget and self.calls_today + cost > self.daily_budget:
+                raise QuotaExhausted(
+                    f"Daily API call budget of {self.daily_budget} exhausted"
+                )
+            self.calls_today += cost
+
+            now = time.monotonic()
+            elapsed, self._last = now - self._last, now
+
+            delay = 0.0
+            for bucket in self._buckets:
+                rate, capacity, tokens = bucket
+                tokens = min(capacity, tokens + elapsed * rate) - 1
+                bucket[2] = tokens
+                if tokens < 0:
+                    delay = max(delay, -tokens / rate)
+
+            self.waited += delay
+        RATE_LIMIT_WAIT.inc(delay)
+        # Increments commute, so the store is written outside the lock
+        if self.store:
+            self.store.charge(today.isoformat(), cost)
+        return delay
+
+    @staticmethod
+    def _today():
+        return datetime.now(timezone.utc).date()
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = RateLimiter(
+                per_second=settings.RATE_LIMIT_PER_SECOND,
+                per_minute=settings.RATE_LIMIT_PER_MINUTE,
+                daily_budget=settings.DAILY_CALL_BUDGET,
+                store=get_checkpoint(),
+            )
+            logger.debug(
+                "Rate limiter initialized: "
+                f"{settings.RATE_LIMIT_PER_SECOND}/s, "
+                f"{settings.RATE_LIMIT_PER_MINUTE}/min, "
+                f"daily budget {settings.DAILY_CALL_BUDGET or 'unlimited'}, "
+                f"{_limiter.calls_today} call(s) charged today."
+            )
+        return _limiter
@@ -2,12 +2,38 @@ import requests
 from requests.adapters import HTTPAdapter, Retry
 
 
-def init_session(max_retries, backoff_factor):
+class LimitedRetry(Retry):
+    """
+    Retry policy that charges each retried request to a `RateLimiter`, so
+    retries are paced and count against the daily budget like the first try.
+    """
+
+    limiter = None
+    cost = 1
+
+    def new(self, **kw):
+        retry = super().new(**kw)
+        retry.limiter, retry.cost = self.limiter, self.cost
+        return retry
+
+    def increment(self, *args, **kwargs):
+        retry = super().increment(*args, **kwargs)
+        if self.limiter is not None:
+            self.limiter.acquire(self.cost)
+        return retry
+
+
+def init_session(max_retries, backoff_factor, pool_size=10, limiter=None, cost=1):
     session = requests.Session()
-    retries = Retry(
+    retries = LimitedRetry(
         total=max_retries,
         backoff_factor=backoff_factor,
         status_forcelist=[500, 502, 503, 504, 429],
     )
-    session.mount("https://", HTTPAdapter(max_retries=retries))
+    retries.limiter, retries.cost = limiter, cost
+    # Keep a connection per request in flight, or urllib3 discards and
+    # reopens them as soon as more threads than `pool_size` share the session.
+    adapter = HTTPAdapter(max_retries=retries, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
     return session
@@ -1,18 +1,65 @@
-from decouple import config
+from decouple import Csv, config
 
 LOG_LEVEL = config("LOG_LEVEL", default="INFO")
 TOKEN = config("TOKEN")
 CLIENT_BATCH_SIZE = config("CLIENT_BATCH_SIZE", default=1000, cast=int)
-INSERT_CHUNK_COUNT = config("INSERT_CHUNK_COUNT", default=20, cast=int)
+CLIENT_ENGINE = config("CLIENT_ENGINE", default="thread")
+CLIENT_CONCURRENCY = config("CLIENT_CONCURRENCY", default=100, cast=int)
+CLIENT_THREADS = config("CLIENT_THREADS", default=10, cast=int)
+CLIENT_MIN_THREADS = config("CLIENT_MIN_THREADS", default=2, cast=int)
+CLIENT_MAX_THREADS = config("CLIENT_MAX_THREADS", default=50, cast=int)
+CLIENT_TARGET_P95_MS = config("CLIENT_TARGET_P95_MS", default=3000, cast=float)
+CLIENT_MAX_ERROR_RATE = config("CLIENT_MAX_ERROR_RATE", default=0.02, cast=float)
+EODHD_BASE_URL = config("EODHD_BASE_URL", default="https://eodhistoricaldata.com/api/")
+INSERT_CHUNK_KB = config("INSERT_CHUNK_KB", default=4096, cast=int)
+INSERT_WORKERS = config("INSERT_WORKERS", default=1, cast=int)
+INSERT_MODE = config("INSERT_MODE", default="delete")
+PIPELINE_QUEUE_SIZE = config("PIPELINE_QUEUE_SIZE", default=1, cast=int)
+TRANSFORM_WORKERS = config("TRANSFORM_WORKERS", default=1, cast=int)
+TRANSFORM_PARALLEL_MIN_TICKERS = config(
+    "TRANSFORM_PARALLEL_MIN_TICKERS", default=200, cast=int
+)
+HIST_QUARTERLY_DEPTH = config("HIST_QUARTERLY_DEPTH", default=6, cast=int)
+HIST_YEARLY_DEPTH = config("HIST_YEARLY_DEPTH", default=2, cast=int)
 SUMMARY_OUTPUT_TABLE = config("SUMMARY_OUTPUT_TABLE")
 SUMMARY_HIST_OUTPUT_TABLE = config("SUMMARY_HIST_OUTPUT_TABLE")
 DB_TICKERS_QUERY = config("DB_TICKERS_QUERY")
 INSERTER_MAX_RETRIES = config("INSERTER_MAX_RETRIES", default=3, cast=int)
 REQUEST_MAX_RETRIES = config("REQUEST_MAX_RETRIES", default=3, cast=int)
 REQUEST_BACKOFF_FACTOR = config("REQUEST_BACKOFF_FACTOR", default=2, cast=int)
+REQUEST_CONNECT_TIMEOUT = config("REQUEST_CONNECT_TIMEOUT", default=5, cast=float)
+REQUEST_READ_TIMEOUT = config("REQUEST_READ_TIMEOUT", default=30, cast=float)
+RUN_DEADLINE_MINUTES = config("RUN_DEADLINE_MINUTES", default=0, cast=float)
+HEDGE_QUANTILE = config("HEDGE_QUANTILE", default=0, cast=float)
+HEDGE_WORKERS = config("HEDGE_WORKERS", default=4, cast=int)
+REQUEST_FIELD_FILTER = config("REQUEST_FIELD_FILTER", default=True, cast=bool)
+JSON_STREAMING = config("JSON_STREAMING", default=False, cast=bool)
+RATE_LIMIT_PER_SECOND = config("RATE_LIMIT_PER_SECOND", default=0, cast=float)
+RATE_LIMIT_PER_MINUTE = config("RATE_LIMIT_PER_MINUTE", default=1000, cast=float)
+DAILY_CALL_BUDGET = config("DAILY_CALL_BUDGET", default=0, cast=int)
+FUNDAMENTALS_CALL_COST = config("FUNDAMENTALS_CALL_COST", default=10, cast=int)
+CACHE_PATH = config("CACHE_PATH", default="")
+CACHE_TTL_HOURS = config("CACHE_TTL_HOURS", default=24, cast=float)
+CACHE_MAX_MB = config("CACHE_MAX_MB", default=2048, cast=int)
+CACHE_OFFLINE = config("CACHE_OFFLINE", default=False, cast=bool)
+ARCHIVE_PATH = config("ARCHIVE_PATH", default="")
+CHECKPOINT_PATH = config("CHECKPOINT_PATH", default="")
+SKIP_UNCHANGED = config("SKIP_UNCHANGED", default=False, cast=bool)
+RESUME_RETRY_FAILED = config("RESUME_RETRY_FAILED", default=False, cast=bool)
+OUTPUT_SINKS = config("OUTPUT_SINKS", default="mssql", cast=Csv())
+PARQUET_PATH = config("PARQUET_PATH", default="")
+PARQUET_COMPRESSION = config("PARQUET_COMPRESSION", default="zstd")
+PARQUET_ROW_GROUP_ROWS = config("PARQUET_ROW_GROUP_ROWS", default=100000, cast=int)
+METRICS_PATH = config("METRICS_PATH", default="")
+METRICS_FORMAT = config("METRICS_FORMAT", default="json")
+OTEL_TRACING = config("OTEL_TRACING", default=False, cast=bool)
 MSSQL_AD_LOGIN = config("MSSQL_AD_LOGIN", cast=bool, default=False)
 MSSQL_SERVER = config("MSSQL_SERVER")
 MSSQL_DATABASE = config("MSSQL_DATABASE")
+MSSQL_POOL_SIZE = config("MSSQL_POOL_SIZE", default=4, cast=int)
+MSSQL_TOKEN_REFRESH_MINUTES = config(
+    "MSSQL_TOKEN_REFRESH_MINUTES", default=5, cast=float
+)
 
 if not MSSQL_AD_LOGIN:
     MSSQL_USERNAME = config("MSSQL_USERNAME")
@@ -1,5 +1,7 @@
 import struct
+import threading
 import warnings
+from concurrent.futures import ThreadPoolExecutor
 
 import pandas as pd
 import pyodbc
@@ -7,6 +9,7 @@ from azure.identity import DefaultAzureCredential
 from fast_to_sql import fast_to_sql
 
 from config import logger, settings
+from database.pool import AccessTokenCache, ConnectionPool
 
 warnings.filterwarnings("ignore")
 
@@ -29,45 +32,33 @@ class MSSQLDatabase(object):
         PASSWORD = settings.MSSQL_PASSWORD
 
     def __init__(self):
-        self.cnx_kwargs = {}
-        if not self.AD_LOGIN:
-            self.cnx_str = (
-                "DRIVER={ODBC Driver 18 for SQL Server};"
-                f"SERVER={self.SERVER};DATABASE={self.DATABASE};"
-                f"UID={self.USERNAME};PWD={self.PASSWORD}"
-            )
-        else:
-            token = self.fecth_token()
-            self.cnx_kwargs["attrs_before"] = pyodbc_attrs(token)
-            self.cnx_str = (
+        self.pool = get_connection_pool()
+
+    @classmethod
+    def connect(cls):
+        if not cls.AD_LOGIN:
+            return pyodbc.connect(
                 "DRIVER={ODBC Driver 18 for SQL Server};"
-                f"SERVER={self.SERVER};DATABASE={self.DATABASE};Encrypt=yes"
+                f"SERVER={cls.SERVER};DATABASE={cls.DATABASE};"
+                f"UID={cls.USERNAME};PWD={cls.PASSWORD}"
             )
 
-    def _get_connection(self):
-        return pyodbc.connect(self.cnx_str, **self.cnx_kwargs)
-
-    def reopen_connection(self):
-        try:
-            if hasattr(self, "cnx") and self.cnx:
-                self.cnx.close()
-        except Exception as e:
-            logger.debug(f"Error closing stale connection: {e}")
-
-        self.cnx = self._get_connection()
+        return pyodbc.connect(
+            "DRIVER={ODBC Driver 18 for SQL Server};"
+            f"SERVER={cls.SERVER};DATABASE={cls.DATABASE};Encrypt=yes",
+            attrs_before=pyodbc_attrs(get_token_cache().token()),
+        )
 
     def select_table(self, query):
-        self.reopen_connection()
         logger.info(query)
         try:
-            df = pd.read_sql(query, self.cnx)
+            with self.pool.connection() as cnx:
+                df = pd.read_sql(query, cnx)
             logger.debug(f"Selected {len(df)} rows")
             return df
         except Exception as e:
             logger.error(f"Error executing SELECT query: {e}")
             raise
-        finally:
-            self.cnx.close()
 
     def insert_table(
         self,
@@ -76,16 +67,113 @@ class MSSQLDatabase(object):
         if_exists="append",
         delete_prev_records=True,
         chunk_size=20000,
+        delete_tickers=None,
     ):
-        self.reopen_connection()
-        if delete_prev_records:
-            try:
-                query = f"DELETE FROM {table_name}"
-                cursor = self.cnx.cursor()
-                cursor.execute(query)
-            except Exception as e:
-                logger.error(f"Error on deleting {table_name} rows: {e}")
+        """
+        Inserts `df` in chunks and commits once. `delete_prev_records` clears
+        the table first; `delete_tickers` only removes those tickers' rows,
+        in the same transaction as the insert.
+        """
+        custom = self.custom_types(df)
+
+        success = False
+        try:
+            with self.pool.connection() as cnx:
+                if delete_prev_records:
+                    try:
+                        query = f"DELETE FROM {table_name}"
+                        cursor = cnx.cursor()
+                        cursor.execute(query)
+                    except Exception as e:
+                        logger.error(f"Error on deleting {table_name} rows: {e}")
+                if delete_tickers:
+                    self._delete_tickers(cnx.cursor(), table_name, delete_tickers)
+
+                total_rows = len(df)
+                logger.info(
+                    f"Starting insertion of {total_rows} rows into {table_name} "
+                    "in chunks"
+                )
+                for start in range(0, total_rows, chunk_size):
+                    end = min(start + chunk_size, total_rows)
+                    fast_to_sql(
+                        df=df.iloc[start:end],
+                        name=table_name,
+                        conn=cnx,
+                        if_exists=if_exists if start == 0 else "append",
+                        custom=custom,
+                    )
+                    logger.debug(
+                        f"Inserted rows {start + 1} to {end} into {table_name}"
+                    )
+
+                cnx.commit()
+            success = True
+        except Exception as e:
+            logger.error(f"Error inserting into table {table_name}: {e}")
+
+        return success
 
+    def insert_parallel(self, df, table_name, chunk_size=20000, workers=4):
+        """
+        Inserts `df` in chunks spread over `workers` connections at once. Each
+        connection commits its own chunks, so this is meant for heaps such as
+        the staging tables, where concurrent inserts take no conflicting locks
+        and a partially loaded table can simply be discarded.
+        """
+        custom = self.custom_types(df)
+        chunks = [df.iloc[s : s + chunk_size] for s in range(0, len(df), chunk_size)]
+        workers = max(1, min(workers, len(chunks)))
+
+        def load(part):
+            with self.pool.connection() as cnx:
+                for chunk in part:
+                    fast_to_sql(
+                        df=chunk,
+                        name=table_name,
+                        conn=cnx,
+                        if_exists="append",
+                        custom=custom,
+                    )
+                cnx.commit()
+
+        logger.info(
+            f"Starting insertion of {len(df)} rows into {table_name} in "
+            f"{len(chunks)} chunks over {workers} connections"
+        )
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(load, chunks[i::workers]) for i in range(workers)
+            ]
+
+        try:
+            for future in futures:
+                future.result()
+        except Exception as e:
+            logger.error(f"Error inserting into table {table_name}: {e}")
+            return False
+
+        return True
+
+    def delete_tickers(self, table_name, tickers):
+        with self.pool.connection() as cnx:
+            self._delete_tickers(cnx.cursor(), table_name, tickers)
+            cnx.commit()
+
+    @staticmethod
+    def _delete_tickers(cursor, table_name, tickers):
+        # SQL Server takes at most 2100 parameters per statement
+        tickers = list(tickers)
+        for start in range(0, len(tickers), 1000):
+            chunk = tickers[start : start + 1000]
+            cursor.execute(
+                f"DELETE FROM {table_name} WHERE eodhd_ticker IN "
+                f"({', '.join('?' * len(chunk))})",
+                chunk,
+            )
+
+    @staticmethod
+    def custom_types(df):
         custom = {}
 
         for column in df.columns.tolist():
@@ -95,30 +183,222 @@ class MSSQLDatabase(object):
             if "timestamp" in column.lower() or "date" in column.lower():
                 custom[column] = "datetime"
 
-        try:
-            total_rows = len(df)
-            logger.info(
-                f"Starting insertion of {total_rows} rows into {table_name} in chunks"
+        return custom
+
+    @staticmethod
+    def staging_name(table_name):
+        return f"{table_name}_staging"
+
+    def prepare_staging(self, table_name, keep_existing=False):
+        """
+        (Re)creates an empty heap copy of `table_name`'s columns to load into;
+        its indexes and constraints are only built before the swap, once the
+        rows are in. Rows still arrive through parameterized inserts, so the
+        load is fully logged. With `keep_existing`, a staging table left by an
+        interrupted run is kept with its rows.
+        """
+        staging = self.staging_name(table_name)
+        create = f"SELECT TOP 0 * INTO {staging} FROM {table_name}"
+        if keep_existing:
+            self.execute(f"IF OBJECT_ID('{staging}') IS NULL {create}")
+        else:
+            self.execute(f"DROP TABLE IF EXISTS {staging}; {create}")
+        logger.info(f"Staging table {staging} prepared for {table_name}")
+
+    def staging_exists(self, table_name):
+        staging = self.staging_name(table_name)
+        found = self.select_table(f"SELECT OBJECT_ID('{staging}') AS id")
+        return bool(found["id"].notna().iloc[0])
+
+    def swap_staging(self, table_name):
+        """
+        Replaces the contents of `table_name` with its fully loaded staging
+        table. The staging table first gets the output table's indexes and
+        check constraints, which ALTER TABLE ... SWITCH requires; then, in one
+        transaction, the output table is truncated and the staging rows are
+        switched into it as a metadata-only change. Readers see either the
+        previous contents or the new ones, and the output table itself, with
+        its indexes, constraints and grants, is kept.
+        """
+        staging = self.staging_name(table_name)
+        for statement in self.staging_ddl(table_name):
+            self.execute(statement)
+        self.execute(
+            "SET XACT_ABORT ON; BEGIN TRANSACTION; "
+            f"TRUNCATE TABLE {table_name}; "
+            f"ALTER TABLE {staging} SWITCH TO {table_name}; "
+            "COMMIT TRANSACTION"
+        )
+        self.drop_staging(table_name)
+        logger.info(f"Staging table {staging} switched into {table_name}")
+
+    def staging_ddl(self, table_name):
+        """
+        Statements giving the staging table the clustered and nonclustered
+        indexes, primary key, unique and check constraints of `table_name`,
+        read from the catalog. Each is skipped when already there, as a
+        resumed run may have built some before it was interrupted. Constraint
+        names are schema-wide, so the staging copies get a `_staging` suffix.
+        """
+        staging = self.staging_name(table_name)
+        schema = table_name.rpartition(".")[0]
+        prefix = f"{schema}." if schema else ""
+        columns = self.select_table(
+            "SELECT i.name, i.type_desc, i.is_unique, i.is_primary_key, "
+            "i.is_unique_constraint, i.filter_definition, c.name AS column_name, "
+            "ic.is_descending_key, ic.is_included_column "
+            "FROM sys.indexes i "
+            "JOIN sys.index_columns ic "
+            "ON ic.object_id = i.object_id AND ic.index_id = i.index_id "
+            "JOIN sys.columns c "
+            "ON c.object_id = ic.object_id AND c.column_id = ic.column_id "
+            f"WHERE i.object_id = OBJECT_ID('{table_name}') AND i.type IN (1, 2) "
+            "ORDER BY i.index_id, ic.is_included_column, ic.key_ordinal, "
+            "ic.index_column_id"
+        )
+
+        statements = []
+        for name, index in columns.groupby("name", sort=False):
+            first = index.iloc[0]
+            keys = ", ".join(
+                f"[{c.column_name}] {'DESC' if c.is_descending_key else 'ASC'}"
+                for c in index.itertuples()
+                if not c.is_included_column
             )
-            for start in range(0, total_rows, chunk_size):
-                end = min(start + chunk_size, total_rows)
-                fast_to_sql(
-                    df=df.iloc[start:end],
-                    name=table_name,
-                    conn=self.cnx,
-                    if_exists=if_exists if start == 0 else "append",
-                    custom=custom,
+            kind = first.type_desc  # CLUSTERED or NONCLUSTERED
+            if first.is_primary_key or first.is_unique_constraint:
+                constraint = f"{name}_staging"
+                kind = f"{'PRIMARY KEY' if first.is_primary_key else 'UNIQUE'} {kind}"
+                statements.append(
+                    f"IF OBJECT_ID('{prefix}{constraint}') IS NULL "
+                    f"ALTER TABLE {staging} "
+                    f"ADD CONSTRAINT [{constraint}] {kind} ({keys})"
                 )
-                logger.debug(f"Inserted rows {start + 1} to {end} into {table_name}")
+                continue
+
+            included = [
+                c.column_name for c in index.itertuples() if c.is_included_column
+            ]
+            create = (
+                f"CREATE {'UNIQUE ' if first.is_unique else ''}{kind} INDEX [{name}] "
+                f"ON {staging} ({keys})"
+            )
+            if included:
+                create += f" INCLUDE ({', '.join(f'[{c}]' for c in included)})"
+            if first.filter_definition:
+                create += f" WHERE {first.filter_definition}"
+            statements.append(
+                "IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE object_id = "
+                f"OBJECT_ID('{staging}') AND name = '{name}') {create}"
+            )
+
+        checks = self.select_table(
+            "SELECT name, definition FROM sys.check_constraints "
+            f"WHERE parent_object_id = OBJECT_ID('{table_name}')"
+        )
+        for check in checks.itertuples():
+            constraint = f"{check.name}_staging"
+            statements.append(
+                f"IF OBJECT_ID('{prefix}{constraint}') IS NULL "
+                f"ALTER TABLE {staging} "
+                f"WITH CHECK ADD CONSTRAINT [{constraint}] CHECK {check.definition}"
+            )
+        return statements
+
+    def merge_staging(self, table_name, keys, columns, compare, prune_by=None):
+        """
+        Upserts the staging table into `table_name` on `keys`. Matched rows are
+        only updated when one of the `compare` columns differs (EXCEPT treats
+        NULLs as equal), so unchanged rows generate no writes or log records.
+        A staging row whose `compare` columns are all NULL, as written for a
+        ticker whose fetch failed, is only inserted and never blanks an
+        existing row.
+        With `prune_by`, target rows missing from staging are deleted for the
+        `prune_by` values present in staging. Returns the affected row counts
+        per action.
+        """
+        staging = self.staging_name(table_name)
+        on = " AND ".join(
+            f"(t.[{k}] = s.[{k}] OR (t.[{k}] IS NULL AND s.[{k}] IS NULL))"
+            for k in keys
+        )
+        filled = " OR ".join(f"s.[{c}] IS NOT NULL" for c in compare)
+        source = ", ".join(f"s.[{c}]" for c in compare)
+        target = ", ".join(f"t.[{c}]" for c in compare)
+        updates = ", ".join(f"[{c}] = s.[{c}]" for c in columns if c not in keys)
+        names = ", ".join(f"[{c}]" for c in columns)
+        values = ", ".join(f"s.[{c}]" for c in columns)
+        query = (
+            f"MERGE {table_name} WITH (HOLDLOCK) AS t USING {staging} AS s ON {on} "
+            f"WHEN MATCHED AND ({filled}) "
+            f"AND EXISTS (SELECT {source} EXCEPT SELECT {target}) "
+            f"THEN UPDATE SET {updates} "
+            f"WHEN NOT MATCHED BY TARGET THEN INSERT ({names}) VALUES ({values}) "
+        )
+        if prune_by:
+            query += (
+                f"WHEN NOT MATCHED BY SOURCE AND t.[{prune_by}] IN "
+                f"(SELECT [{prune_by}] FROM {staging}) THEN DELETE "
+            )
+        query += "OUTPUT $action;"
+
+        try:
+            with self.pool.connection() as cnx:
+                cursor = cnx.cursor()
+                cursor.execute(query)
+                counts = {"INSERT": 0, "UPDATE": 0, "DELETE": 0}
+                for (action,) in cursor.fetchall():
+                    counts[action] += 1
+                cnx.commit()
+        except Exception as e:
+            logger.error(f"Error merging {staging} into {table_name}: {e}")
+            raise
+
+        logger.info(
+            f"Merged {staging} into {table_name}: {counts['INSERT']} inserted, "
+            f"{counts['UPDATE']} updated, {counts['DELETE']} deleted"
+        )
+        return counts
 
-            self.cnx.commit()
+    def drop_staging(self, table_name):
+        self.execute(f"DROP TABLE IF EXISTS {self.staging_name(table_name)}")
+
+    def execute(self, query):
+        try:
+            with self.pool.connection() as cnx:
+                cnx.cursor().execute(query)
+                cnx.commit()
         except Exception as e:
-            logger.error(f"Error inserting into table {table_name}: {e}")
-        finally:
-            self.cnx.close()
+            logger.error(f"Error executing query: {e}")
+            raise
 
-    @staticmethod
-    def fecth_token():
-        credential = DefaultAzureCredential(exclude_shared_token_cache_credential=True)
-        token = credential.get_token("https://database.windows.net/.default").token
-        return token
+
+_token_cache = None
+_pool = None
+_lock = threading.Lock()
+
+
+def get_token_cache():
+    global _token_cache
+    with _lock:
+        if _token_cache is None:
+            _token_cache = AccessTokenCache(
+                lambda: DefaultAzureCredential(
+                    exclude_shared_token_cache_credential=True
+                ),
+                "https://database.windows.net/.default",
+                refresh_margin=settings.MSSQL_TOKEN_REFRESH_MINUTES * 60,
+            )
+        return _token_cache
+
+
+def get_connection_pool():
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = ConnectionPool(MSSQLDatabase.connect, size=settings.MSSQL_POOL_SIZE)
+            logger.debug(
+                f"Connection pool initialized: {settings.MSSQL_POOL_SIZE} idle "
+                "connections kept."
+            )
+        return _pool
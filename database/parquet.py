@@ -0,0 +1,255 @@
+import glob
+import os
+import shutil
+from datetime import datetime
+
+import pandas as pd
+
+from config import logger, settings
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - depends on the environment
+    pa = pc = pq = None
+
+
+class ParquetWriter:
+    """
+    Writes the output tables as a Parquet dataset under PARQUET_PATH,
+    partitioned by run date: `<table>/run_date=YYYY-MM-DD/data.parquet`.
+
+    Every batch is first written to its own file in `<table>/_staging-<date>`,
+    which survives an interrupted run so it can resume. A resumed run drops
+    its batches' tickers from the files staged before, as the interrupted
+    run may have staged some of them without recording the batch as written.
+    `finish()` compacts the staged batches into row groups of ROW_GROUP_ROWS
+    rows and moves the file into its partition, replacing output of an
+    earlier run that day.
+
+    Column types come from the table's `_common_metadata` schema, inferred
+    from the first batch ever written and extended when columns are added.
+    Numbers are stored as float64 and other values as strings, so a value of
+    the wrong type in a later batch becomes null instead of failing the file.
+    """
+
+    PATH = settings.PARQUET_PATH
+    COMPRESSION = settings.PARQUET_COMPRESSION
+    ROW_GROUP_ROWS = settings.PARQUET_ROW_GROUP_ROWS
+
+    def __init__(self, resume=False):
+        if pq is None:
+            raise RuntimeError("The parquet sink needs pyarrow installed.")
+        if not self.PATH:
+            raise ValueError("PARQUET_PATH must be set for the parquet sink.")
+
+        self.resume = resume
+        self.run_date = datetime.utcnow().date().isoformat()
+        # table -> False once any batch of it failed during this run
+        self.state = {}
+        self.schemas = {}
+        self.batches = {}
+        # table -> {file staged before resuming: tickers it still holds}
+        self.resumed = {}
+
+    def staging(self, t):
+        return os.path.join(self.PATH, t, f"_staging-{self.run_date}")
+
+    def write(self, tables):
+        """Stages one batch; returns False if any of its tables failed."""
+        ok = True
+        tickers = set().union(*(df["eodhd_ticker"] for df in tables.values()))
+        for t, dataframe in tables.items():
+            if t not in self.state:
+                self.state[t] = True
+                self.prepare(t)
+
+            try:
+                self.unstage(t, tickers)
+            except Exception as e:
+                logger.error(f"Failed to drop resumed tickers from '{t}': {e}")
+                self.state[t] = ok = False
+                continue
+
+            if dataframe.empty:
+                continue
+
+            path = os.path.join(self.staging(t), f"batch-{self.batches[t]:06d}.parquet")
+            try:
+                table = self.to_arrow(t, dataframe)
+                pq.write_table(table, path + ".tmp", compression=self.COMPRESSION)
+                os.replace(path + ".tmp", path)
+            except Exception as e:
+                logger.error(f"Failed to stage Parquet batch for '{t}': {e}")
+                self.state[t] = ok = False
+                continue
+
+            self.batches[t] += 1
+            logger.debug(f"Staged {len(dataframe)} row(s) of '{t}' in {path}.")
+        return ok
+
+    def prepare(self, t):
+        """
+        Sets up the table's staging directory. A resumed run keeps the batches
+        staged before the interruption, along with the run date they belong to.
+        """
+        previous = sorted(glob.glob(os.path.join(self.PATH, t, "_staging-*")))
+        if self.resume and previous:
+            self.run_date = previous[-1].rsplit("_staging-", 1)[1]
+        else:
+            for path in previous:
+                shutil.rmtree(path)
+
+        os.makedirs(self.staging(t), exist_ok=True)
+        staged = self.staged(t)
+        self.batches[t] = len(staged)
+        if self.resume:
+            self.resumed[t] = {
+                path: set(
+                    pq.read_table(path, columns=["eodhd_ticker"]).column(0).to_pylist()
+                )
+                for path in staged
+            }
+
+        metadata = os.path.join(self.PATH, t, "_common_metadata")
+        if os.path.exists(metadata):
+            self.schemas[t] = pq.read_schema(metadata)
+
+    def unstage(self, t, tickers):
+        """Rewrites the batches staged before resuming without `tickers`."""
+        for path, held in self.resumed.get(t, {}).items():
+            if held.isdisjoint(tickers):
+                continue
+
+            table = pq.read_table(path)
+            keep = pc.invert(
+                pc.is_in(table["eodhd_ticker"], pa.array(list(held & tickers)))
+            )
+            pq.write_table(
+                table.filter(keep), path + ".tmp", compression=self.COMPRESSION
+            )
+            os.replace(path + ".tmp", path)
+            held -= tickers
+            logger.debug(f"Dropped resumed tickers from staged batch {path}.")
+
+    def staged(self, t):
+        return sorted(glob.glob(os.path.join(self.staging(t), "batch-*.parquet")))
+
+    def to_arrow(self, t, df):
+        schema = self.schemas.get(t)
+        missing = [c for c in df.columns if schema is None or c not in schema.names]
+        if missing:
+            fields = [pa.field(c, self.arrow_type(df[c].dtype)) for c in missing]
+            schema = pa.schema(list(schema or []) + fields)
+            pq.write_metadata(schema, os.path.join(self.PATH, t, "_common_metadata"))
+            self.schemas[t] = schema
+
+        arrays = []
+        for field in schema:
+            if field.name not in df:
+                arrays.append(pa.nulls(len(df), field.type))
+                continue
+
+            column = df[field.name]
+            if pa.types.is_floating(field.type):
+                column = pd.to_numeric(column, errors="coerce")
+            elif pa.types.is_timestamp(field.type):
+                column = pd.to_datetime(column, errors="coerce")
+            elif pa.types.is_string(field.type):
+                column = column.astype("string")
+            arrays.append(pa.array(column, type=field.type, from_pandas=True))
+        return pa.Table.from_arrays(arrays, schema=schema)
+
+    @staticmethod
+    def arrow_type(dtype):
+        if pd.api.types.is_datetime64_any_dtype(dtype):
+            return pa.timestamp("us")
+        if pd.api.types.is_bool_dtype(dtype):
+            return pa.bool_()
+        if pd.api.types.is_numeric_dtype(dtype):
+            return pa.float64()
+        return pa.string()
+
+    def finish(self):
+        if self.resume:
+            # The interrupted run may have staged every batch and died before
+            # compacting them, leaving none for this run to write.
+            for path in glob.glob(os.path.join(self.PATH, "*", "_staging-*")):
+                t = os.path.basename(os.path.dirname(path))
+                if t not in self.state:
+                    self.state[t] = True
+                    self.prepare(t)
+
+        for t, ok in self.state.items():
+            if not ok:
+                logger.error(
+                    f"Some batches of '{t}' failed; keeping the current Parquet "
+                    "output and dropping the staged batches."
+                )
+                shutil.rmtree(self.staging(t), ignore_errors=True)
+                continue
+
+            if t not in self.schemas:
+                # Nothing was ever written for this table
+                continue
+
+            partition = os.path.join(self.PATH, t, f"run_date={self.run_date}")
+            os.makedirs(partition, exist_ok=True)
+            path = os.path.join(partition, "data.parquet")
+            rows, groups = self.compact(t, path)
+            shutil.rmtree(self.staging(t))
+            logger.info(
+                f"Wrote {rows} row(s) of '{t}' to {path} in {groups} row group(s)."
+            )
+
+    def compact(self, t, path):
+        """
+        Streams the staged batches into `path` in row groups of ROW_GROUP_ROWS,
+        holding at most one row group plus one batch in memory. The file is
+        written under a hidden name, which dataset readers skip, and renamed
+        into place once complete.
+        """
+        schema = self.schemas[t]
+        tmp = os.path.join(os.path.dirname(path), ".data.parquet.tmp")
+        rows = groups = 0
+        buffered = []
+
+        with pq.ParquetWriter(tmp, schema, compression=self.COMPRESSION) as writer:
+            for staged in self.staged(t):
+                buffered.append(self.conform(pq.read_table(staged), schema))
+                table = pa.concat_tables(buffered)
+                full = table.num_rows // self.ROW_GROUP_ROWS * self.ROW_GROUP_ROWS
+                if full:
+                    writer.write_table(
+                        table.slice(0, full), row_group_size=self.ROW_GROUP_ROWS
+                    )
+                    groups += full // self.ROW_GROUP_ROWS
+                buffered = [table.slice(full)]
+                rows += full
+
+            table = pa.concat_tables(buffered) if buffered else None
+            if table is not None and table.num_rows:
+                writer.write_table(table, row_group_size=self.ROW_GROUP_ROWS)
+                rows += table.num_rows
+                groups += 1
+
+        os.replace(tmp, path)
+        return rows, groups
+
+    @staticmethod
+    def conform(table, schema):
+        """Batches staged before columns were added get them as nulls."""
+        if table.schema.equals(schema):
+            return table
+        return pa.Table.from_arrays(
+            [
+                (
+                    table.column(f.name)
+                    if f.name in table.schema.names
+                    else pa.nulls(table.num_rows, f.type)
+                )
+                for f in schema
+            ],
+            schema=schema,
+        )
@@ -0,0 +1,107 @@
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+from config import logger
+
+
+class AccessTokenCache:
+    """
+    Caches an Azure AD access token and fetches a new one once it is within
+    `refresh_margin` seconds of expiring, so new connections never present a
+    token that expires mid-handshake and the credential chain runs once per
+    token lifetime rather than once per connection.
+    """
+
+    def __init__(self, credential_factory, scope, refresh_margin=300):
+        self.credential_factory = credential_factory
+        self.scope = scope
+        self.refresh_margin = refresh_margin
+        self.credential = None
+        self.access_token = None
+        self.refreshes = 0
+        self.lock = threading.Lock()
+
+    def token(self):
+        with self.lock:
+            if self.access_token is None or self.expires_in() < self.refresh_margin:
+                if self.credential is None:
+                    self.credential = self.credential_factory()
+                self.access_token = self.credential.get_token(self.scope)
+                self.refreshes += 1
+                logger.debug(
+                    f"Fetched access token, expires in {self.expires_in():.0f}s."
+                )
+            return self.access_token.token
+
+    def expires_in(self):
+        return self.access_token.expires_on - time.time()
+
+
+class ConnectionPool:
+    """
+    Keeps up to `size` idle DB-API connections for reuse across calls and
+    batches. Checked-out connections are pinged first and replaced when the
+    ping fails; a connection returned after an error is closed, not reused.
+    """
+
+    HEALTHCHECK_QUERY = "SELECT 1"
+
+    def __init__(self, connect, size=4):
+        self.connect = connect
+        self.idle = queue.LifoQueue(maxsize=size)
+        self.opened = 0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            try:
+                cnx = self.idle.get_nowait()
+            except queue.Empty:
+                break
+            if self.healthy(cnx):
+                return cnx
+            self.discard(cnx)
+
+        with self.lock:
+            self.opened += 1
+        return self.connect()
+
+    def release(self, cnx):
+        try:
+            cnx.rollback()
+            self.idle.put_nowait(cnx)
+        except Exception:
+            self.discard(cnx)
+
+    def discard(self, cnx):
+        try:
+            cnx.close()
+        except Exception as e:
+            logger.debug(f"Error closing pooled connection: {e}")
+
+    def healthy(self, cnx):
+        try:
+            cnx.cursor().execute(self.HEALTHCHECK_QUERY).fetchone()
+            return True
+        except Exception as e:
+            logger.debug(f"Pooled connection failed health check: {e}")
+            return False
+
+    @contextmanager
+    def connection(self):
+        cnx = self.acquire()
+        try:
+            yield cnx
+        except BaseException:
+            self.discard(cnx)
+            raise
+        self.release(cnx)
+
+    def close(self):
+        while True:
+            try:
+                self.discard(self.idle.get_nowait())
+            except queue.Empty:
+                return
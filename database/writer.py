@@ -0,0 +1,228 @@
+import logging
+import time
+
+from config import logger, settings
+from database.helper import init_db_instance
+from metrics import INSERT_ROWS, INSERT_SECONDS
+from transformer.const import HIST_KEYS, KEYS
+
+
+class TableWriter:
+    """
+    Writes transformed batches to the output tables according to INSERT_MODE:
+
+    - "delete": the first batch of a run deletes each table's previous rows,
+      later batches append (the original behaviour);
+    - "swap": every batch is loaded into a staging copy of the table, which
+      `finish()` switches in atomically once the whole run has loaded;
+    - "merge": every batch is loaded into the staging table and merged into
+      the output table on its natural keys, touching only changed rows.
+    """
+
+    MODE = settings.INSERT_MODE
+    CHUNK_BYTES = settings.INSERT_CHUNK_KB * 1024
+    WORKERS = settings.INSERT_WORKERS
+    # table -> (merge keys, column whose values scope deletes of stale rows)
+    MERGE = {
+        settings.SUMMARY_OUTPUT_TABLE: (KEYS, None),
+        settings.SUMMARY_HIST_OUTPUT_TABLE: (HIST_KEYS, "eodhd_ticker"),
+    }
+    # Stamped on every run, so left out of the change comparison
+    MERGE_IGNORE = ["timestamp_created_utc"]
+
+    def __init__(self, resume=False):
+        # table -> False once any insert into it failed during this run
+        self.state = {}
+        # Continuing an interrupted run: keep the rows and staging tables
+        # already loaded instead of clearing them on the first batch, but
+        # replace any rows of the batch's tickers the interrupted run loaded
+        # before its batch was recorded as written.
+        self.resume = resume
+
+    def write(self, tables):
+        """Writes one batch; returns False if any of its tables failed."""
+        logger.info("Establishing database connection...")
+        conn = init_db_instance()
+        ok = True
+        tickers = None
+        if self.resume and self.MODE in ("delete", "swap"):
+            tickers = sorted(
+                set().union(*(df["eodhd_ticker"] for df in tables.values()))
+            )
+
+        for t, dataframe in tables.items():
+            logger.info(f"\nProcessing table '{t}' with {len(dataframe)} row(s)...")
+
+            first_batch = t not in self.state
+            if first_batch:
+                self.state[t] = True
+                if self.MODE == "swap":
+                    conn.prepare_staging(t, keep_existing=self.resume)
+
+            if dataframe.empty:
+                if tickers and not self.replace(conn, t, tickers):
+                    self.state[t] = ok = False
+                logger.warning(f"No data to insert for table '{t}'. Skipping.")
+                continue
+
+            start = time.perf_counter()
+            if self.MODE == "merge":
+                merged = self.merge(conn, t, dataframe)
+                if merged:
+                    self.record(t, dataframe, start)
+                ok = merged and ok
+                continue
+
+            target = conn.staging_name(t) if self.MODE == "swap" else t
+            delete_prev_records = (
+                first_batch and self.MODE == "delete" and not self.resume
+            )
+
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Data preview for table '{t}':\n{dataframe.head()}\n...")
+            if self.MODE == "swap":
+                replaced = not tickers or self.replace(conn, t, tickers)
+                inserted = replaced and self.insert_staging(conn, dataframe, target)
+            else:
+                chunk_size = self.calculate_chunk_size(dataframe)
+                logger.debug(
+                    f"Inserting data into table '{target}' with chunk size "
+                    f"{chunk_size}..."
+                )
+                inserted = conn.insert_table(
+                    dataframe,
+                    target,
+                    delete_prev_records=delete_prev_records,
+                    chunk_size=chunk_size,
+                    delete_tickers=tickers,
+                )
+            if inserted:
+                self.record(t, dataframe, start)
+                logger.info(f"Data inserted into table '{target}' successfully.")
+            else:
+                self.state[t] = ok = False
+
+        return ok
+
+    def replace(self, conn, t, tickers):
+        """Deletes `tickers`' rows from the table this mode loads `t` into."""
+        target = conn.staging_name(t) if self.MODE == "swap" else t
+        try:
+            conn.delete_tickers(target, tickers)
+        except Exception as e:
+            logger.error(f"Error deleting resumed tickers' rows from {target}: {e}")
+            return False
+        return True
+
+    @staticmethod
+    def record(t, dataframe, start):
+        INSERT_ROWS.inc(len(dataframe), table=t)
+        INSERT_SECONDS.inc(time.perf_counter() - start, table=t)
+
+    def merge(self, conn, t, dataframe):
+        keys, prune_by = self.MERGE[t]
+        # MERGE rejects a source that matches one target row more than once;
+        # the keys tell every transformed row apart, so only repeats go
+        dataframe = dataframe.drop_duplicates(subset=keys, keep="last")
+        columns = dataframe.columns.tolist()
+        compare = [c for c in columns if c not in keys and c not in self.MERGE_IGNORE]
+
+        conn.prepare_staging(t)
+        if not self.insert_staging(conn, dataframe, conn.staging_name(t)):
+            self.state[t] = False
+            return False
+
+        try:
+            conn.merge_staging(t, keys, columns, compare, prune_by=prune_by)
+        except Exception:
+            self.state[t] = False
+            return False
+        return True
+
+    def finish(self):
+        if self.MODE not in ("swap", "merge"):
+            return
+        if not self.state and not (self.resume and self.MODE == "swap"):
+            return
+
+        conn = init_db_instance()
+        if self.resume and self.MODE == "swap":
+            # The interrupted run may have loaded every batch and died before
+            # its swap, leaving none for this run to write.
+            for t in self.MERGE:
+                if t not in self.state and conn.staging_exists(t):
+                    self.state[t] = True
+        if not self.state:
+            return
+
+        if self.MODE == "merge":
+            for t, ok in self.state.items():
+                if not ok:
+                    logger.error(f"Some batches failed to merge into '{t}'.")
+                conn.drop_staging(t)
+            return
+
+        for t, ok in self.state.items():
+            if ok:
+                conn.swap_staging(t)
+            else:
+                logger.error(
+                    f"Inserts into staging for '{t}' failed; keeping the current "
+                    "table and dropping the staging copy."
+                )
+                conn.drop_staging(t)
+
+    def insert_staging(self, conn, df, staging):
+        chunk_size = self.calculate_chunk_size(df)
+        if self.WORKERS > 1:
+            # Make sure every connection gets a share of smaller batches
+            chunk_size = min(chunk_size, -(-len(df) // self.WORKERS))
+            return conn.insert_parallel(
+                df, staging, chunk_size=chunk_size, workers=self.WORKERS
+            )
+        return conn.insert_table(
+            df, staging, delete_prev_records=False, chunk_size=chunk_size
+        )
+
+    def calculate_chunk_size(self, df):
+        """
+        Rows per insert round trip, so each chunk carries about CHUNK_BYTES of
+        data going by the frame's in-memory size.
+        """
+        row_bytes = max(1, df.memory_usage(deep=True, index=False).sum() // len(df))
+        chunk_size = int(max(1, min(len(df), self.CHUNK_BYTES // row_bytes)))
+        logger.debug(
+            f"DataFrame has {len(df)} rows of ~{row_bytes} bytes, "
+            f"calculated chunk size: {chunk_size}."
+        )
+        return chunk_size
+
+
+class MultiWriter:
+    """Hands every batch to each writer; a batch is written once all succeed."""
+
+    def __init__(self, writers):
+        self.writers = writers
+
+    def write(self, tables):
+        return all([w.write(tables) for w in self.writers])
+
+    def finish(self):
+        for w in self.writers:
+            w.finish()
+
+
+def init_writer(resume=False):
+    """Writer for the sinks listed in OUTPUT_SINKS."""
+    writers = []
+    for sink in settings.OUTPUT_SINKS:
+        if sink == "mssql":
+            writers.append(TableWriter(resume=resume))
+        elif sink == "parquet":
+            from database.parquet import ParquetWriter
+
+            writers.append(ParquetWriter(resume=resume))
+        else:
+            raise ValueError(f"Unknown output sink '{sink}'.")
+
+    return writers[0] if len(writers) == 1 else MultiWriter(writers)
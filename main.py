@@ -1,8 +1,30 @@
-from client.engine import Engine
+import time
+from collections import Counter
+from functools import partial
+
+from client.concurrency import get_concurrency_controller
+from client.helper import init_engine
+from client.parser import digest
+from client.ratelimit import get_rate_limiter
 from config import logger
-from database.helper import init_db_instance, load_tickers
+from database.helper import load_tickers
+from database.writer import init_writer
+from metrics import TRANSFORM_ROWS, write_report
+from pipeline import Pipeline
+from pipeline.checkpoint import get_checkpoint
 from transformer import Agent
-from config.settings import INSERT_CHUNK_COUNT, CLIENT_BATCH_SIZE
+from config.settings import (
+    CLIENT_BATCH_SIZE,
+    INSERT_MODE,
+    METRICS_FORMAT,
+    METRICS_PATH,
+    OUTPUT_SINKS,
+    PIPELINE_QUEUE_SIZE,
+    RESUME_RETRY_FAILED,
+    RUN_DEADLINE_MINUTES,
+    SKIP_UNCHANGED,
+    TRANSFORM_WORKERS,
+)
 
 
 def create_batches(tickers):
@@ -17,72 +39,165 @@ def create_batches(tickers):
     return batches
 
 
-def calculate_chunk_size(df):
-    chunk_count = INSERT_CHUNK_COUNT
-    if len(df) <= chunk_count:
-        logger.debug(
-            f"DataFrame has {len(df)} rows, using chunk size equal to row count."
+def fetch_batch(i, batch, previous=None, deadline=None, unfetched=None):
+    """
+    Fetches one batch into an Agent. `previous` maps tickers to the payload
+    hash they were last written with; tickers whose payload still hashes the
+    same are left out of the Agent, so they are neither transformed nor
+    written. No tickers are fetched after `deadline`; tickers the engine never
+    got to are appended to the `unfetched` list.
+    """
+    logger.info(f"\n=== Fetching Batch #{i+1} (Size: {len(batch)}) ===")
+    checkpoint = get_checkpoint()
+    previous = previous or {}
+    hashes = {}
+    skipped = 0
+    if TRANSFORM_WORKERS > 1:
+        # Raw bodies are kept so decoding also runs in the transform processes.
+        engine = init_engine(batch, raw=True, deadline=deadline)
+        engine.run()
+        if checkpoint:
+            hashes = {
+                t: None if body is None else digest(body)
+                for t, body in engine.data.items()
+            }
+        data = {
+            t: body
+            for t, body in engine.data.items()
+            if t not in previous or previous[t] != hashes[t]
+        }
+        skipped = len(engine.data) - len(data)
+        transformer = Agent(data)
+    else:
+        transformer = Agent()
+
+        def on_result(ticker, fundamentals):
+            nonlocal skipped
+            if checkpoint:
+                h = None if fundamentals is None else digest(fundamentals)
+                hashes[ticker] = h
+                if ticker in previous and previous[ticker] == h:
+                    skipped += 1
+                    return
+            transformer.add(ticker, fundamentals)
+
+        engine = init_engine(batch, on_result=on_result, deadline=deadline)
+        engine.run()
+    if unfetched is not None:
+        unfetched.extend(
+            t for t in dict.fromkeys(engine.tickers) if t and t not in engine.status
         )
-        return len(df)
+    statuses = Counter(s.status for s in engine.status.values())
+    logger.info(
+        f"Batch #{i+1}: Engine run completed. Data fetched: "
+        + ", ".join(f"{n} {status}" for status, n in sorted(statuses.items()))
+    )
+    if checkpoint:
+        checkpoint.fetched(hashes)
+    if engine.hedged:
+        logger.info(f"Batch #{i+1}: {engine.hedged} hedged request(s) sent.")
+    if skipped:
+        logger.info(f"Batch #{i+1}: {skipped} unchanged ticker(s) skipped.")
+    limiter = get_rate_limiter()
+    logger.info(
+        f"Rate limiter: {limiter.waited:.1f}s total wait, "
+        f"{limiter.calls_today} API call(s) charged today."
+    )
+    concurrency = get_concurrency_controller()
+    logger.info(
+        f"Concurrency: {concurrency.limit} request(s) in flight "
+        f"(p95 {concurrency.p95:.2f}s, errors {concurrency.error_rate:.0%})."
+    )
+    return transformer
+
 
-    chunk_size = int(len(df) / chunk_count)
-    logger.debug(f"DataFrame has {len(df)} rows, calculated chunk size: {chunk_size}.")
-    return chunk_size
+def transform_batch(i, transformer):
+    logger.info(f"Batch #{i+1}: Transforming fetched data using Agent...")
+    tables = transformer.transform()
+    for t, df in tables.items():
+        TRANSFORM_ROWS.inc(len(df), table=t)
+    logger.info(f"Batch #{i+1}: Transformation complete.")
+    return tables
 
 
 def main():
-    insertion_state = {}
     logger.info("Starting data processing pipeline...")
 
-    logger.info("Loading tickers from database...")
-    tickers = load_tickers()
-    logger.info(f"{len(tickers)} tickers loaded.")
-
+    checkpoint = get_checkpoint()
+    resume = checkpoint is not None and checkpoint.unfinished()
+    # Only outputs that merge on their keys can take a failed ticker's rows
+    # again without duplicating the empty ones already written.
+    upserting = INSERT_MODE == "merge" and OUTPUT_SINKS == ["mssql"]
+    if resume:
+        retry_failed = RESUME_RETRY_FAILED and upserting
+        if RESUME_RETRY_FAILED and not upserting:
+            logger.warning(
+                "RESUME_RETRY_FAILED only applies with INSERT_MODE=merge and the "
+                "mssql sink alone; not retrying failed tickers."
+            )
+        tickers = checkpoint.pending(retry_failed=retry_failed)
+        logger.info(f"Resuming unfinished run: {len(tickers)} ticker(s) pending.")
+    else:
+        logger.info("Loading tickers from database...")
+        tickers = load_tickers()
+        logger.info(f"{len(tickers)} tickers loaded.")
+        if checkpoint:
+            checkpoint.start(tickers)
+
+    previous = None
+    if checkpoint and SKIP_UNCHANGED:
+        # Parquet partitions are full snapshots, so they need every ticker
+        if upserting:
+            previous = checkpoint.previous_hashes()
+        else:
+            logger.warning(
+                "SKIP_UNCHANGED only applies with INSERT_MODE=merge and the mssql "
+                "sink alone; writing every ticker."
+            )
+
+    deadline = None
+    if RUN_DEADLINE_MINUTES:
+        deadline = time.monotonic() + RUN_DEADLINE_MINUTES * 60
+
+    # A run that died before its first write never cleared the tables or
+    # loaded anything worth keeping, so it starts over.
+    writer = init_writer(resume=resume and checkpoint.written_count() > 0)
     batches = create_batches(tickers)
-
-    for i, batch in enumerate(batches):
-        logger.info(
-            f"\n=== Processing Batch #{i+1} of {len(batches)} (Size: {len(batch)}) ==="
-        )
-
-        logger.info("Initializing Engine...")
-        engine = Engine(batch)
-        logger.info("Engine initialized.")
-
-        logger.info("Running Engine to fetch data...")
-        engine.run()
-        logger.info("Engine run completed. Data fetched.")
-
-        logger.info("Transforming fetched data using Agent...")
-        transformer = Agent(engine.data)
-        tables = transformer.transform()
-        logger.info(f"Transformation complete.")
-
-        logger.info("Establishing database connection...")
-        conn = init_db_instance()
-
-        for t, dataframe in tables.items():
-            logger.info(f"\nProcessing table '{t}' with {len(dataframe)} row(s)...")
-
-            delete_prev_records = t not in insertion_state
-            if delete_prev_records:
-                insertion_state[t] = True
-
-            if not dataframe.empty:
-                logger.debug(f"Data preview for table '{t}':\n{dataframe.head()}\n...")
-                chunk_size = calculate_chunk_size(dataframe)
-                logger.debug(
-                    f"Inserting data into table '{t}' with chunk size {chunk_size}..."
-                )
-                conn.insert_table(
-                    dataframe,
-                    t,
-                    delete_prev_records=delete_prev_records,
-                    chunk_size=chunk_size,
-                )
-                logger.info(f"Data inserted into table '{t}' successfully.")
-            else:
-                logger.warning(f"No data to insert for table '{t}'. Skipping.")
+    unfetched = []
+    logger.info(f"Processing {len(batches)} batch(es) through staged pipeline...")
+
+    def write_batch(i, tables):
+        if writer.write(tables) and checkpoint:
+            checkpoint.written(t for t, *_ in batches[i])
+
+    pipeline = Pipeline(
+        fetch=partial(
+            fetch_batch, previous=previous, deadline=deadline, unfetched=unfetched
+        ),
+        transform=transform_batch,
+        write=write_batch,
+        queue_size=PIPELINE_QUEUE_SIZE,
+    )
+    try:
+        pipeline.run(batches)
+        if unfetched:
+            # Publishing now would replace the tables with a partial run, and
+            # closing the checkpoint would drop the tickers still to fetch.
+            logger.error(
+                f"Run stopped with {len(unfetched)} ticker(s) unfetched; not "
+                "publishing the output" + (", rerun to resume." if checkpoint else ".")
+            )
+            raise SystemExit(1)
+        writer.finish()
+        if checkpoint:
+            changes = checkpoint.finish()
+            logger.info(
+                "Ticker changes since the last written run: "
+                + ", ".join(f"{n} {kind}" for kind, n in changes.items())
+            )
+    finally:
+        if METRICS_PATH:
+            write_report(METRICS_PATH, METRICS_FORMAT)
 
     logger.info("\nPipeline execution completed.")
 
@@ -0,0 +1,105 @@
+import json
+import time
+
+from config import logger
+from metrics.registry import Registry
+from metrics.tracing import span  # noqa: F401
+
+REGISTRY = Registry()
+STARTED = time.time()
+
+# Fetch
+FETCH_SECONDS = REGISTRY.histogram(
+    "eodhd_fetch_seconds", "Time to fetch one ticker, by outcome"
+)
+RESPONSE_BYTES = REGISTRY.counter(
+    "eodhd_response_bytes_total", "Fundamentals response bytes downloaded"
+)
+RETRIES = REGISTRY.counter(
+    "eodhd_retries_total", "Requests retried, by the status that caused it"
+)
+THROTTLED = REGISTRY.counter(
+    "eodhd_throttled_total", "HTTP 429 responses received from the API"
+)
+HEDGED = REGISTRY.counter("eodhd_hedged_requests_total", "Hedged requests sent")
+CACHE_REQUESTS = REGISTRY.counter(
+    "eodhd_cache_requests_total", "Response cache lookups, by result"
+)
+RATE_LIMIT_WAIT = REGISTRY.counter(
+    "rate_limiter_wait_seconds_total", "Time requests waited on the rate limiter"
+)
+ARCHIVE_BYTES = REGISTRY.counter(
+    "archive_bytes_total", "Compressed bytes appended to the response archive"
+)
+CONCURRENCY = REGISTRY.gauge(
+    "engine_concurrency", "Requests in flight allowed by the adaptive controller"
+)
+
+# Decode and transform
+DECODE_SECONDS = REGISTRY.histogram(
+    "json_decode_seconds", "Time to decode one fundamentals body, by mode"
+)
+TRANSFORM_ROWS = REGISTRY.counter(
+    "transform_rows_total", "Rows produced by the transformer, by table"
+)
+TRANSFORM_SECONDS = REGISTRY.counter(
+    "transform_seconds_total", "Time spent transforming, by step"
+)
+
+# Write
+INSERT_ROWS = REGISTRY.counter("insert_rows_total", "Rows written, by table")
+INSERT_SECONDS = REGISTRY.counter(
+    "insert_seconds_total", "Time spent writing rows, by table"
+)
+
+# Pipeline
+STAGE_SECONDS = REGISTRY.histogram(
+    "pipeline_stage_seconds", "Time a pipeline stage spent on one batch, by stage"
+)
+QUEUE_DEPTH = REGISTRY.gauge(
+    "pipeline_queue_depth", "Batches waiting in a pipeline queue, by queue"
+)
+
+
+def report():
+    """JSON-ready run report: every metric plus derived throughput figures."""
+    values = REGISTRY.to_dict()
+
+    def total(name, **labels):
+        return sum(
+            s.get("value", 0)
+            for s in values[name]["series"]
+            if labels.items() <= s["labels"].items()
+        )
+
+    transform_seconds = total("transform_seconds_total")
+    rates = {
+        "transform_rows_per_second": (
+            total("transform_rows_total") / transform_seconds
+            if transform_seconds
+            else None
+        )
+    }
+    for s in values["insert_seconds_total"]["series"]:
+        table = s["labels"]["table"]
+        rates[f"insert_rows_per_second[{table}]"] = (
+            total("insert_rows_total", table=table) / s["value"] if s["value"] else None
+        )
+
+    return {
+        "started_at": STARTED,
+        "elapsed_seconds": time.time() - STARTED,
+        "throughput": rates,
+        "metrics": values,
+    }
+
+
+def write_report(path, fmt="json"):
+    if fmt == "prometheus":
+        body = REGISTRY.to_prometheus()
+    else:
+        body = json.dumps(report(), indent=2)
+
+    with open(path, "w") as f:
+        f.write(body)
+    logger.info(f"Run metrics written to {path} ({fmt}).")
@@ -0,0 +1,183 @@
+import math
+import threading
+
+LATENCY_BUCKETS = (
+    0.001,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    300.0,
+)
+
+
+class Metric:
+    """
+    Base of the in-process instruments: values are kept per label set, so
+    `inc(table="summary")` and `inc(table="summary_hist")` are two series.
+    """
+
+    TYPE = None
+
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+        self.values = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(labels):
+        return tuple(sorted(labels.items()))
+
+    def series(self):
+        with self._lock:
+            return list(self.values.items())
+
+    def reset(self):
+        with self._lock:
+            self.values = {}
+
+
+class Counter(Metric):
+    TYPE = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    TYPE = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self.values[self._key(labels)] = value
+
+
+class Histogram(Metric):
+    """
+    Cumulative-bucket histogram in the Prometheus style. Quantiles for the
+    JSON report are interpolated within buckets, like `histogram_quantile`.
+    """
+
+    TYPE = "histogram"
+
+    def __init__(self, name, help, buckets=LATENCY_BUCKETS):
+        super().__init__(name, help)
+        self.buckets = tuple(buckets) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self.values.get(key, ([0] * len(self.buckets), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self.values[key] = (counts, total + value)
+
+    def series(self):
+        with self._lock:
+            return [(k, (list(c), t)) for k, (c, t) in self.values.items()]
+
+    def quantile(self, q, counts):
+        count = sum(counts)
+        if not count:
+            return 0.0
+
+        rank = q * count
+        seen = 0
+        lower = 0.0
+        for bound, n in zip(self.buckets, counts):
+            if seen + n >= rank and n:
+                if math.isinf(bound):
+                    return lower
+                return lower + (bound - lower) * (rank - seen) / n
+            seen += n
+            lower = bound
+        return lower
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+
+    def counter(self, name, help):
+        return self._register(Counter(name, help))
+
+    def gauge(self, name, help):
+        return self._register(Gauge(name, help))
+
+    def histogram(self, name, help, buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(name, help, buckets))
+
+    def _register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def reset(self):
+        for m in self.metrics.values():
+            m.reset()
+
+    def to_prometheus(self):
+        lines = []
+        for m in self.metrics.values():
+            lines.append(f"# HELP {m.name} {m.help}")
+            lines.append(f"# TYPE {m.name} {m.TYPE}")
+            for key, value in m.series():
+                if m.TYPE != "histogram":
+                    lines.append(f"{m.name}{_labels(key)} {_number(value)}")
+                    continue
+
+                counts, total = value
+                cumulative = 0
+                for bound, n in zip(m.buckets, counts):
+                    cumulative += n
+                    le = "+Inf" if math.isinf(bound) else _number(bound)
+                    lines.append(
+                        f"{m.name}_bucket{_labels(key + (('le', le),))} {cumulative}"
+                    )
+                lines.append(f"{m.name}_sum{_labels(key)} {_number(total)}")
+                lines.append(f"{m.name}_count{_labels(key)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+    def to_dict(self):
+        report = {}
+        for m in self.metrics.values():
+            series = []
+            for key, value in m.series():
+                entry = {"labels": dict(key)}
+                if m.TYPE == "histogram":
+                    counts, total = value
+                    entry.update(
+                        count=sum(counts),
+                        sum=total,
+                        p50=m.quantile(0.5, counts),
+                        p95=m.quantile(0.95, counts),
+                        p99=m.quantile(0.99, counts),
+                    )
+                else:
+                    entry["value"] = value
+                series.append(entry)
+            report[m.name] = {"type": m.TYPE, "help": m.help, "series": series}
+        return report
+
+
+def _labels(key):
+    if not key:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in key) + "}"
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
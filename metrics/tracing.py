@@ -0,0 +1,26 @@
+from contextlib import nullcontext
+
+from config import settings
+
+try:
+    from opentelemetry import trace
+except ImportError:  # pragma: no cover - depends on the environment
+    trace = None
+
+_tracer = None
+
+
+def span(name, **attributes):
+    """
+    OpenTelemetry span around a block when OTEL_TRACING is on and the
+    opentelemetry API is installed, otherwise a no-op context. Exporters are
+    configured the standard OpenTelemetry way (e.g. `opentelemetry-instrument`
+    and the OTEL_* environment variables).
+    """
+    global _tracer
+    if not settings.OTEL_TRACING or trace is None:
+        return nullcontext()
+
+    if _tracer is None:
+        _tracer = trace.get_tracer("eodhd-summary")
+    return _tracer.start_as_current_span(name, attributes=attributes)
@@ -0,0 +1 @@
+from pipeline.runner import Pipeline
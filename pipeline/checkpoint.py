@@ -0,0 +1,204 @@
+import sqlite3
+import threading
+import time
+
+from config import logger, settings
+
+
+class Checkpoint:
+    """
+    Per-ticker progress of the current run in a SQLite file: fetch status,
+    payload hash and whether the ticker's rows were written. A run that never
+    reached `finish()` is unfinished, and the next run resumes its pending
+    tickers instead of reloading the universe and clearing the tables.
+
+    The hash of every written ticker is also kept across runs, so a run can
+    tell which tickers changed since they were last written, as are the API
+    calls charged per UTC day against DAILY_CALL_BUDGET.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.cnx = sqlite3.connect(path, check_same_thread=False)
+        self.cnx.execute("PRAGMA journal_mode=WAL")
+        self.cnx.execute(
+            "CREATE TABLE IF NOT EXISTS run ("
+            "id INTEGER PRIMARY KEY CHECK (id = 1), started_at REAL, "
+            "finished_at REAL)"
+        )
+        self.cnx.execute(
+            "CREATE TABLE IF NOT EXISTS tickers ("
+            "ticker TEXT PRIMARY KEY, bbg_ticker TEXT, currency TEXT, "
+            "position INTEGER, fetch_status TEXT, payload_hash TEXT, "
+            "previous_hash TEXT, written INTEGER NOT NULL DEFAULT 0, "
+            "updated_at REAL)"
+        )
+        self.cnx.execute(
+            "CREATE TABLE IF NOT EXISTS hashes ("
+            "ticker TEXT PRIMARY KEY, payload_hash TEXT, written_at REAL)"
+        )
+        self.cnx.execute(
+            "CREATE TABLE IF NOT EXISTS calls ("
+            "day TEXT PRIMARY KEY, calls INTEGER NOT NULL)"
+        )
+        self.cnx.commit()
+
+    def unfinished(self):
+        with self._lock:
+            row = self.cnx.execute("SELECT finished_at FROM run").fetchone()
+        return row is not None and row[0] is None
+
+    def start(self, tickers):
+        """Records a new run over `tickers`, replacing any previous one."""
+        with self._lock:
+            self.cnx.execute("DELETE FROM tickers")
+            self.cnx.executemany(
+                "INSERT OR IGNORE INTO tickers "
+                "(ticker, bbg_ticker, currency, position) VALUES (?, ?, ?, ?)",
+                [(t, bbg, curr, i) for i, (t, bbg, curr) in enumerate(tickers)],
+            )
+            self.cnx.execute(
+                "UPDATE tickers SET previous_hash = (SELECT payload_hash "
+                "FROM hashes WHERE hashes.ticker = tickers.ticker)"
+            )
+            self.cnx.execute(
+                "INSERT OR REPLACE INTO run (id, started_at, finished_at) "
+                "VALUES (1, ?, NULL)",
+                (time.time(),),
+            )
+            self.cnx.commit()
+
+    def pending(self, retry_failed=False):
+        """
+        Tickers of the unfinished run whose rows were not written yet. With
+        `retry_failed`, tickers whose fetch failed are included again even
+        though their empty rows were written.
+        """
+        where = "written = 0"
+        if retry_failed:
+            where += " OR fetch_status = 'failed'"
+        with self._lock:
+            return self.cnx.execute(
+                "SELECT ticker, bbg_ticker, currency FROM tickers "
+                f"WHERE {where} ORDER BY position"
+            ).fetchall()
+
+    def written_count(self):
+        with self._lock:
+            return self.cnx.execute(
+                "SELECT COUNT(*) FROM tickers WHERE written = 1"
+            ).fetchone()[0]
+
+    def previous_hashes(self):
+        """{ticker: hash when last written} for the tickers of this run."""
+        with self._lock:
+            return dict(
+                self.cnx.execute(
+                    "SELECT ticker, previous_hash FROM tickers "
+                    "WHERE previous_hash IS NOT NULL"
+                )
+            )
+
+    def fetched(self, results):
+        """Stores fetch status and payload hash from {ticker: hash or None}."""
+        now = time.time()
+        with self._lock:
+            self.cnx.executemany(
+                "UPDATE tickers SET fetch_status = ?, payload_hash = ?, "
+                "updated_at = ? WHERE ticker = ?",
+                [("ok" if h else "failed", h, now, t) for t, h in results.items()],
+            )
+            self.cnx.commit()
+
+    def written(self, tickers):
+        """
+        Marks fetched `tickers` as written, failed ones included since their
+        empty rows were written too, and keeps the hash of successful ones.
+        Tickers never fetched stay pending.
+        """
+        now = time.time()
+        rows = [(now, t) for t in tickers]
+        with self._lock:
+            self.cnx.executemany(
+                "UPDATE tickers SET written = 1, updated_at = ? "
+                "WHERE ticker = ? AND fetch_status IS NOT NULL",
+                rows,
+            )
+            self.cnx.executemany(
+                "INSERT OR REPLACE INTO hashes (ticker, payload_hash, written_at) "
+                "SELECT ticker, payload_hash, ? FROM tickers "
+                "WHERE ticker = ? AND fetch_status = 'ok'",
+                rows,
+            )
+            self.cnx.commit()
+
+    def calls(self, day):
+        """API calls charged on `day` (an ISO date) by any run."""
+        with self._lock:
+            row = self.cnx.execute(
+                "SELECT calls FROM calls WHERE day = ?", (day,)
+            ).fetchone()
+        return row[0] if row else 0
+
+    def charge(self, day, cost):
+        with self._lock:
+            self.cnx.execute(
+                "INSERT INTO calls (day, calls) VALUES (?, ?) "
+                "ON CONFLICT (day) DO UPDATE SET calls = calls + excluded.calls",
+                (day, cost),
+            )
+            self.cnx.commit()
+
+    def changes(self):
+        """Counts of new, changed, unchanged, failed and removed tickers."""
+        with self._lock:
+            new, changed, unchanged, failed = self.cnx.execute(
+                "SELECT "
+                "COUNT(CASE WHEN fetch_status = 'ok' "
+                "AND previous_hash IS NULL THEN 1 END), "
+                "COUNT(CASE WHEN fetch_status = 'ok' "
+                "AND payload_hash <> previous_hash THEN 1 END), "
+                "COUNT(CASE WHEN fetch_status = 'ok' "
+                "AND payload_hash = previous_hash THEN 1 END), "
+                "COUNT(CASE WHEN fetch_status = 'failed' THEN 1 END) "
+                "FROM tickers"
+            ).fetchone()
+            removed = self.cnx.execute(
+                "SELECT COUNT(*) FROM hashes "
+                "WHERE ticker NOT IN (SELECT ticker FROM tickers)"
+            ).fetchone()[0]
+        return {
+            "new": new,
+            "changed": changed,
+            "unchanged": unchanged,
+            "failed": failed,
+            "removed": removed,
+        }
+
+    def finish(self):
+        """Closes the run and returns its `changes()`."""
+        changes = self.changes()
+        with self._lock:
+            self.cnx.execute(
+                "DELETE FROM hashes WHERE ticker NOT IN (SELECT ticker FROM tickers)"
+            )
+            self.cnx.execute("UPDATE run SET finished_at = ?", (time.time(),))
+            self.cnx.commit()
+        return changes
+
+
+_checkpoint = None
+_checkpoint_lock = threading.Lock()
+
+
+def get_checkpoint():
+    global _checkpoint
+    if not settings.CHECKPOINT_PATH:
+        return None
+
+    with _checkpoint_lock:
+        if _checkpoint is None:
+            _checkpoint = Checkpoint(settings.CHECKPOINT_PATH)
+            logger.debug(f"Run checkpoint kept at {settings.CHECKPOINT_PATH}.")
+        return _checkpoint
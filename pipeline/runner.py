@@ -0,0 +1,114 @@
+import queue
+import threading
+import time
+
+from config import logger
+from metrics import QUEUE_DEPTH, STAGE_SECONDS, span
+
+_DONE = object()
+
+
+class Pipeline:
+    """
+    Runs fetch, transform and write as concurrent stages linked by bounded
+    queues, so batch N+1 downloads while batch N is transformed and written.
+    A full queue blocks the upstream stage (backpressure), which keeps at most
+    `queue_size` finished batches waiting between two stages.
+    """
+
+    POLL_INTERVAL = 0.5
+
+    def __init__(self, fetch, transform, write, queue_size=1):
+        self.fetch = fetch
+        self.transform = transform
+        self.write = write
+        self.queue_size = queue_size
+        self.error = None
+        self._stop = threading.Event()
+
+    def run(self, batches):
+        fetched = queue.Queue(maxsize=self.queue_size)
+        transformed = queue.Queue(maxsize=self.queue_size)
+
+        threads = [
+            threading.Thread(
+                target=self._stage,
+                args=("fetch", self.fetch, iter(enumerate(batches)), fetched),
+                name="pipeline-fetch",
+            ),
+            threading.Thread(
+                target=self._stage,
+                args=(
+                    "transform",
+                    self.transform,
+                    self._drain("fetch", fetched),
+                    transformed,
+                ),
+                name="pipeline-transform",
+            ),
+        ]
+        for t in threads:
+            t.start()
+
+        try:
+            for i, item in self._drain("transform", transformed):
+                self._call("write", self.write, i, item)
+        except Exception as e:
+            self._fail("write", e)
+        finally:
+            self._stop.set()
+            for t in threads:
+                t.join()
+
+        if self.error is not None:
+            raise self.error
+
+    def _stage(self, name, func, source, target):
+        try:
+            for i, item in source:
+                if self._stop.is_set():
+                    break
+                if not self._put(target, (i, self._call(name, func, i, item))):
+                    break
+                QUEUE_DEPTH.set(target.qsize(), queue=name)
+        except Exception as e:
+            self._fail(name, e)
+        finally:
+            self._put(target, _DONE, force=True)
+
+    @staticmethod
+    def _call(name, func, i, item):
+        start = time.perf_counter()
+        with span(name, batch=i):
+            result = func(i, item)
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=name)
+        return result
+
+    def _drain(self, name, source):
+        """Yields the items `name` stage put on `source` until it is done."""
+        while not self._stop.is_set():
+            try:
+                item = source.get(timeout=self.POLL_INTERVAL)
+            except queue.Empty:
+                continue
+
+            if item is _DONE:
+                return
+            QUEUE_DEPTH.set(source.qsize(), queue=name)
+            yield item
+
+    def _put(self, target, item, force=False):
+        while force or not self._stop.is_set():
+            try:
+                target.put(item, timeout=self.POLL_INTERVAL)
+                return True
+            except queue.Full:
+                if force and self._stop.is_set():
+                    return False
+        return False
+
+    def _fail(self, stage, error):
+        logger.error(f"Pipeline stage '{stage}' failed: {error}")
+        if self.error is None:
+            self.error = error
+        self._stop.set()
@@ -0,0 +1,164 @@
+"""
+Rebuilds the output tables from stored fundamentals instead of the API:
+
+    python replay.py --from archive/
+    python replay.py --from archive/fundamentals-2026-10-16.arc --tables hist
+    python replay.py --from cache.db --tickers AAPL.US,MSFT.US --sinks parquet
+
+`--from` takes a response archive, a directory of archives (a ticker archived
+on several days is replayed from the latest) or the SQLite response cache.
+Archived responses are whole documents. Cached ones fetched with
+REQUEST_FIELD_FILTER only hold the fields mapped at the time, so fields added
+since come out NULL for them; replay warns about such payloads per batch.
+Batches stream through Agent and the configured sinks as pipeline stages, so
+reading, transforming and writing overlap, and TRANSFORM_WORKERS processes
+(or `--workers`) share the transform.
+"""
+
+import argparse
+import glob
+import math
+import os
+import time
+from functools import partial
+
+from client import parser
+from client.archive import ResponseArchive
+from client.cache import ResponseCache
+from config import logger, settings
+from database.writer import init_writer
+from main import transform_batch
+from metrics import write_report
+from pipeline import Pipeline
+from transformer import Agent
+from config.settings import (
+    CLIENT_BATCH_SIZE,
+    METRICS_FORMAT,
+    METRICS_PATH,
+    PIPELINE_QUEUE_SIZE,
+)
+
+TABLES = {
+    "summary": settings.SUMMARY_OUTPUT_TABLE,
+    "hist": settings.SUMMARY_HIST_OUTPUT_TABLE,
+}
+SQLITE_HEADER = b"SQLite format 3\x00"
+
+
+def open_sources(path):
+    """{ticker: archive or cache holding its latest payload}."""
+    if os.path.isdir(path):
+        # Archive names sort by day, so later days override earlier ones
+        paths = sorted(glob.glob(os.path.join(path, "*.arc")))
+    else:
+        with open(path, "rb") as f:
+            if f.read(len(SQLITE_HEADER)) == SQLITE_HEADER:
+                cache = ResponseCache(
+                    path, ttl=math.inf, max_bytes=math.inf, offline=True
+                )
+                logger.info(f"{cache.size / 1024**2:.0f} MB of responses cached.")
+                return dict.fromkeys(cache.tickers(), cache)
+        paths = [path]
+
+    sources = {}
+    for p in paths:
+        archive = ResponseArchive(p)
+        sources.update(dict.fromkeys(archive.index, archive))
+        logger.info(f"{len(archive)} ticker(s) archived in {p}.")
+    return sources
+
+
+def read_batch(i, batch, sources):
+    logger.info(f"\n=== Reading Batch #{i+1} (Size: {len(batch)}) ===")
+    groups = {}
+    for ticker in batch:
+        groups.setdefault(sources[ticker], []).append(ticker)
+
+    data = {}
+    for source, tickers in groups.items():
+        data.update(source.items(tickers))
+
+    stale = sum(1 for body in data.values() if parser.filtered(body))
+    if stale:
+        logger.warning(
+            f"Batch #{i+1}: {stale} payload(s) were stored from field-filtered "
+            "requests and only hold the fields mapped at the time; fields added "
+            "since come out NULL for them."
+        )
+    return Agent(data)
+
+
+def transform_tables(i, transformer, tables):
+    return {t: df for t, df in transform_batch(i, transformer).items() if t in tables}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--from", dest="source", required=True)
+    parser.add_argument(
+        "--tables", default="summary,hist", help="comma-separated: summary, hist"
+    )
+    parser.add_argument("--tickers", help="comma-separated subset to replay")
+    parser.add_argument("--batch-size", type=int, default=CLIENT_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=settings.TRANSFORM_WORKERS)
+    parser.add_argument(
+        "--sinks",
+        default=",".join(settings.OUTPUT_SINKS),
+        help="comma-separated output sinks (default OUTPUT_SINKS)",
+    )
+    args = parser.parse_args()
+
+    names = args.tables.split(",")
+    unknown = [n for n in names if n not in TABLES]
+    if unknown:
+        parser.error(f"unknown table(s): {', '.join(unknown)}")
+    tables = {TABLES[n] for n in names}
+    settings.OUTPUT_SINKS = args.sinks.split(",")
+    Agent.WORKERS = args.workers
+
+    logger.info(f"Replaying stored fundamentals from {args.source}...")
+    sources = open_sources(args.source)
+    if args.tickers:
+        requested = args.tickers.split(",")
+        tickers = [t for t in requested if t in sources]
+        if len(tickers) < len(requested):
+            logger.warning(
+                f"{len(requested) - len(tickers)} requested ticker(s) not stored."
+            )
+        logger.warning(
+            "Replaying a subset of tickers: sinks that replace whole tables or "
+            "partitions (INSERT_MODE delete/swap, parquet) will only hold these."
+        )
+    else:
+        tickers = sorted(sources)
+
+    step = args.batch_size
+    batches = [tickers[z : z + step] for z in range(0, len(tickers), step)]
+    logger.info(f"Replaying {len(tickers)} ticker(s) in {len(batches)} batch(es).")
+
+    start = time.perf_counter()
+    writer = init_writer()
+    pipeline = Pipeline(
+        fetch=partial(read_batch, sources=sources),
+        transform=partial(transform_tables, tables=tables),
+        write=lambda i, batch_tables: writer.write(batch_tables),
+        queue_size=PIPELINE_QUEUE_SIZE,
+    )
+    try:
+        pipeline.run(batches)
+        writer.finish()
+    finally:
+        if METRICS_PATH:
+            write_report(METRICS_PATH, METRICS_FORMAT)
+
+    elapsed = time.perf_counter() - start
+    logger.info(
+        f"\nReplay completed: {len(tickers)} ticker(s) in {elapsed:.1f}s "
+        f"({len(tickers) / max(elapsed, 1e-9):.0f} tickers/s)."
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -299,3 +299,205 @@ HIST_COLUMNS = [
     "preferredStockAndOtherAdjustments",
     "timestamp_created_utc",
 ]
+
+# Natural keys of the output tables, used by INSERT_MODE=merge.
+KEYS = ["eodhd_ticker"]
+# Statements are paired by rank, so a ticker with fewer periods of one
+# statement has rows where its date is NULL; only all three dates together
+# tell a ticker's rows apart.
+HIST_KEYS = ["eodhd_ticker", "Period", "balance_sheet_date", "income_date", "cash_date"]
+
+
+# Declarative field mapping used by Agent, per fundamentals section. Each entry
+# is either a source key copied under the same column name, or a
+# (source path, column) pair; nested source keys are joined with ".".
+FIELD_SPEC = {
+    "General": [
+        ("UpdatedAt", "updated_at"),
+        "CurrencyCode",
+        "Sector",
+        "Industry",
+        "GicSector",
+        "GicGroup",
+        "GicIndustry",
+        "GicSubIndustry",
+        ("AddressData.Street", "Street"),
+        ("AddressData.City", "City"),
+        ("AddressData.State", "State"),
+        ("AddressData.Country", "Country"),
+        ("AddressData.ZIP", "ZIP"),
+    ],
+    "Highlights": [
+        "MarketCapitalizationMln",
+        "PERatio",
+        "PEGRatio",
+        "WallStreetTargetPrice",
+        "BookValue",
+        "DividendYield",
+        "ProfitMargin",
+        "OperatingMarginTTM",
+        "ReturnOnAssetsTTM",
+        "ReturnOnEquityTTM",
+        "RevenueTTM",
+        "RevenuePerShareTTM",
+    ],
+    "Valuation": [
+        "TrailingPE",
+        "ForwardPE",
+        "PriceSalesTTM",
+        "PriceBookMRQ",
+        "EnterpriseValue",
+        "EnterpriseValueRevenue",
+        "EnterpriseValueEbitda",
+    ],
+    "SplitsDividends": [
+        "ForwardAnnualDividendRate",
+        "ForwardAnnualDividendYield",
+        "PayoutRatio",
+    ],
+    "SharesStats": ["SharesOutstanding"],
+    "AnalystRatings": ["Rating"],
+    "Balance_Sheet": [
+        ("date", "balance_sheet_date"),
+        ("filing_date", "balance_sheet_filing_date"),
+        "totalAssets",
+        "intangibleAssets",
+        "earningAssets",
+        "otherCurrentAssets",
+        "totalLiab",
+        "totalStockholderEquity",
+        "deferredLongTermLiab",
+        "otherCurrentLiab",
+        "commonStock",
+        "retainedEarnings",
+        "otherLiab",
+        "goodWill",
+        "otherAssets",
+        "cash",
+        "totalCurrentLiabilities",
+        "netDebt",
+        "shortTermDebt",
+        "shortLongTermDebt",
+        "shortLongTermDebtTotal",
+        "otherStockholderEquity",
+        "propertyPlantEquipment",
+        "totalCurrentAssets",
+        "longTermInvestments",
+        "netTangibleAssets",
+        "shortTermInvestments",
+        "netReceivables",
+        "longTermDebt",
+        "inventory",
+        "accountsPayable",
+        "totalPermanentEquity",
+        "noncontrollingInterestInConsolidatedEntity",
+        "temporaryEquityRedeemableNoncontrollingInterests",
+        "accumulatedOtherComprehensiveIncome",
+        "additionalPaidInCapital",
+        "commonStockTotalEquity",
+        "preferredStockTotalEquity",
+        "retainedEarningsTotalEquity",
+        "treasuryStock",
+        "accumulatedAmortization",
+        "nonCurrrentAssetsOther",
+        "deferredLongTermAssetCharges",
+        "nonCurrentAssetsTotal",
+        "capitalLeaseObligations",
+        "longTermDebtTotal",
+        "nonCurrentLiabilitiesOther",
+        "nonCurrentLiabilitiesTotal",
+        "negativeGoodwill",
+        "warrants",
+        "preferredStockRedeemable",
+        "capitalSurpluse",
+        "liabilitiesAndStockholdersEquity",
+        "cashAndShortTermInvestments",
+        "propertyPlantAndEquipmentGross",
+        "propertyPlantAndEquipmentNet",
+        "accumulatedDepreciation",
+        "netWorkingCapital",
+        "netInvestedCapital",
+        "commonStockSharesOutstanding",
+    ],
+    "Cash_Flow": [
+        ("date", "cash_date"),
+        ("filing_date", "cash_filing_date"),
+        "investments",
+        "changeToLiabilities",
+        "totalCashflowsFromInvestingActivities",
+        "netBorrowings",
+        "totalCashFromFinancingActivities",
+        "changeToOperatingActivities",
+        ("netIncome", "cash_netIncome"),
+        "changeInCash",
+        "beginPeriodCashFlow",
+        "endPeriodCashFlow",
+        "totalCashFromOperatingActivities",
+        "depreciation",
+        "otherCashflowsFromInvestingActivities",
+        "dividendsPaid",
+        "changeToInventory",
+        "changeToAccountReceivables",
+        "salePurchaseOfStock",
+        "otherCashflowsFromFinancingActivities",
+        "changeToNetincome",
+        "capitalExpenditures",
+        "changeReceivables",
+        "cashFlowsOtherOperating",
+        "exchangeRateChanges",
+        "cashAndCashEquivalentsChanges",
+        "changeInWorkingCapital",
+        "otherNonCashItems",
+        "freeCashFlow",
+    ],
+    "Income_Statement": [
+        ("date", "income_date"),
+        ("filing_date", "income_filing_date"),
+        "researchDevelopment",
+        "effectOfAccountingCharges",
+        "incomeBeforeTax",
+        "minorityInterest",
+        ("netIncome", "income_netIncome"),
+        "sellingGeneralAdministrative",
+        "sellingAndMarketingExpenses",
+        "grossProfit",
+        "reconciledDepreciation",
+        "ebit",
+        "ebitda",
+        "depreciationAndAmortization",
+        "nonOperatingIncomeNetOther",
+        "operatingIncome",
+        "otherOperatingExpenses",
+        "interestExpense",
+        "taxProvision",
+        "interestIncome",
+        "netInterestIncome",
+        "extraordinaryItems",
+        "nonRecurring",
+        "otherItems",
+        "incomeTaxExpense",
+        "totalRevenue",
+        "totalOperatingExpenses",
+        "costOfRevenue",
+        "totalOtherIncomeExpenseNet",
+        "discontinuedOperations",
+        "netIncomeFromContinuingOps",
+        "netIncomeApplicableToCommonShares",
+        "preferredStockAndOtherAdjustments",
+    ],
+}
+
+STATEMENTS = ["Balance_Sheet", "Cash_Flow", "Income_Statement"]
+
+# Fundamentals fields read by Agent, per top-level section. The client builds
+# its `filter` request parameter from this.
+SOURCE_FIELDS = {
+    section: list(
+        dict.fromkeys(
+            (e if isinstance(e, str) else e[0]).split(".")[0] for e in entries
+        )
+    )
+    for section, entries in FIELD_SPEC.items()
+    if section not in STATEMENTS
+}
+SOURCE_FIELDS["Financials"] = STATEMENTS
@@ -0,0 +1,91 @@
+from transformer.const import COLUMNS, FIELD_SPEC, HIST_COLUMNS, STATEMENTS
+
+SUMMARY_SECTIONS = [s for s in FIELD_SPEC if s not in STATEMENTS]
+
+# Arguments of the compiled row builders, in call order. Sections are passed
+# as dicts; the other arguments are copied to the column of the same name.
+SUMMARY_ARGS = ["eodhd_ticker", "timestamp_created_utc", *SUMMARY_SECTIONS, *STATEMENTS]
+HISTORY_ARGS = [
+    "eodhd_ticker",
+    "timestamp_created_utc",
+    "updated_at",
+    "Period",
+    "CurrencyCode",
+    *STATEMENTS,
+]
+
+
+class RowBuilder:
+    """
+    Compiled form of FIELD_SPEC for one output table. The spec is turned
+    once into the source of a straight-line function returning the row as a
+    tuple in table column order (one `get(key)` per field, one lookup per
+    nested parent), so no per-field dispatch or per-row dict is needed.
+    """
+
+    def __init__(self, name: str, columns: list, args: list):
+        self.name = name
+        self.columns = columns
+        self.args = args
+        sources = self._resolve(name, columns, args)
+        missing = [c for c in columns if c not in sources]
+        if missing:
+            raise ValueError(f"{name} columns not covered by FIELD_SPEC: {missing}")
+
+        self.source = self._generate(columns, args, sources)
+        namespace = {}
+        exec(compile(self.source, f"<row builder {name}>", "exec"), namespace)
+        self.build = namespace["build"]
+
+    @staticmethod
+    def _resolve(name: str, columns: list, args: list) -> dict:
+        """Maps each column to its argument name, or (section, source path)."""
+        sources = {a: a for a in args if a in columns}
+        for section, spec in FIELD_SPEC.items():
+            if section not in args:
+                continue
+            for entry in spec:
+                source, column = (entry, entry) if isinstance(entry, str) else entry
+                if column not in columns:
+                    raise ValueError(
+                        f"FIELD_SPEC['{section}'] maps '{source}' to column "
+                        f"'{column}', which {name} does not have"
+                    )
+                if column in sources:
+                    raise ValueError(f"{name} column '{column}' is mapped twice")
+                sources[column] = (section, *source.split("."))
+        return sources
+
+    @staticmethod
+    def _generate(columns: list, args: list, sources: dict) -> str:
+        lines = [f"def build({', '.join(args)}):"]
+        getters = {}
+        values = []
+        for column in columns:
+            source = sources[column]
+            if isinstance(source, str):
+                values.append(source)
+                continue
+
+            *parents, key = source
+            for depth in range(1, len(parents) + 1):
+                prefix = tuple(parents[:depth])
+                if prefix not in getters:
+                    name = f"get{len(getters)}"
+                    owner = (
+                        prefix[0]
+                        if depth == 1
+                        else f"{getters[prefix[:-1]]}({prefix[-1]!r})"
+                    )
+                    lines.append(f"    {name} = ({owner} or {{}}).get")
+                    getters[prefix] = name
+            values.append(f"{getters[tuple(parents)]}({key!r})")
+
+        lines.append("    return (")
+        lines.extend(f"        {v}," for v in values)
+        lines.append("    )")
+        return "\n".join(lines) + "\n"
+
+
+SUMMARY_ROW = RowBuilder("COLUMNS", COLUMNS, SUMMARY_ARGS).build
+HISTORY_ROW = RowBuilder("HIST_COLUMNS", HIST_COLUMNS, HISTORY_ARGS).build